@@ -1,37 +1,191 @@
+import argparse
+import bisect
 import calendar
+import concurrent.futures
+import contextlib
+import csv
 import datetime
+import functools
+import hashlib
+import io
+import itertools
+import json
 import locale
+import marshal
+import mmap
+import os
+import shutil
+import struct
 import sys
+import threading
+import time
 import typing
+import weakref
+from collections import OrderedDict
 
-from reportlab.lib.colors import (Color, HexColor, black, darkblue, darkred,
-                                  green, lightgrey, red)
-from reportlab.lib.pagesizes import A4, A3, A5, A6
-from reportlab.lib.units import cm
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
+if typing.TYPE_CHECKING:
+    # NumPy is imported by the functions building arrays, so importing
+    # this module or reading packed years does not load it
+    import numpy as np
 
 
 ARABIC_TO_ROMAN = [(1000, "M"), (900, "CM"), (500, "D"), (400, "CD"),
                    (100, "C"), (90, "XC"), (50, "L"), (40, "XL"),
                    (10, "X"), (9, "IX"), (5, "V"), (4, "IV"), (1, "I")]
 
-USAGE = (f"Usage: {sys.argv[0]} 2008\n"
-         "Creates PDF calendar for the mentioned year\n"
+USAGE = ("Creates PDF calendars for the mentioned years\n"
          "in the same folder.\n"
+         "Years are given as 2008, a range 2020-2035 or a list 2024,2026.\n"
          "If no year is specified, then current year is chosen\n"
-         "or next if it is past October.\n"
-         "[--help] - displays this message")
+         "or next if it is past October.")
+
+# points as reportlab defines them, kept here so that computing
+# a year does not import reportlab, see import_reportlab()
+cm = 72 / 2.54
+mm = cm * 0.1
+A3 = (297 * mm, 420 * mm)
+A4 = (210 * mm, 297 * mm)
+A5 = (148 * mm, 210 * mm)
+A6 = (105 * mm, 148 * mm)
+
+PAGE_SIZES = {"A3": A3, "A4": A4, "A5": A5, "A6": A6}
+
+# font name -> TrueType file it is loaded from
+FONT_FILES = {
+    "DejaVuSans": "DejaVuSans.ttf",
+    "Calibri": "Calibri.ttf",
+    "CalibriB": "CalibriB.ttf",
+    "CalibriI": "CalibriI.ttf",
+    "CalibriL": "CalibriL.ttf",
+    "CalibriLI": "CalibriLI.ttf",
+    "CalibriZ": "CalibriZ.ttf",
+}
+
+# fonts registered with reportlab by this process
+registered_fonts: typing.Set[str] = set()
+registered_fonts_lock = threading.Lock()
+
+# day types stored in the per-year day index, a later type
+# takes precedence when a day falls into several categories
+WORKING_DAY = 0
+SHORTENED_DAY = 1
+WEEKEND = 2
+HOLIDAY = 3
+
+# holidays and weekend transfers of every country and year,
+# compiled to RULES_FILE + ".cache" on first load
+RULES_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "holidays.json"
+)
+
+# rendered calendars reused while none of their inputs change
+OUTPUT_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".output_cache"
+)
+
+# magic and format of the compiled rules: data version, source mtime and
+# size, number of countries; a country: code, offset and length of its
+# holidays, first year, number of years and offset of its year table;
+# a year table entry: offset and length of the year transfers
+RULES_HEADER = struct.Struct("<4sIqqI")
+RULES_COUNTRY = struct.Struct("<8sIIiII")
+RULES_YEAR = struct.Struct("<II")
+RULES_MAGIC = b"WTC1"
+
+# serialized CompactYear: magic, year, country, number of days
+# and number of holidays followed by one byte per day and
+# a transferable flag, name length and UTF-8 name per holiday
+COMPACT_HEADER = struct.Struct("<4sh8sHB")
+COMPACT_HOLIDAY = struct.Struct("<?H")
+COMPACT_MAGIC = b"WTY1"
+
+# hours per week, a shortened work day is one hour shorter
+WEEK_NORMS = (40, 36, 24)
+
+DAY_TYPE_NAMES = ("working", "shortened", "weekend", "holiday")
+
+# day type -> color it is rendered with, filled by import_reportlab()
+DAY_COLORS: typing.Dict[int, "Color"] = {}
 
 
 class Cell:
+    __slots__ = ("width", "height")
+
     def __init__(self, width: float, height: float):
         self.width = width
         self.height = height
 
 
+class Layout:
+    """
+    Geometry of a page computed once for a page size and font size:
+    margins, cell size, origins of months, positions of days and weekday
+    names within a month and centers of the schedule table columns.
+    Points are counted from the top left corner of the page, y of months
+    is relative to the top of the year part.
+    """
+    # widths of the schedule table columns in cells
+    SCHEDULE_COLUMNS = (3, 4, 4, 7, 1, 4, 4, 4)
+
+    def __init__(
+            self,
+            page_size: typing.Tuple[float, float],
+            font_size: int
+    ):
+        self.page_size = page_size
+        self.font_size = font_size
+        self.width, self.height = page_size
+        self.top_margin = 1 * cm
+        self.bottom_margin = 1 * cm
+        self.left_margin = 0.5 * cm
+        self.right_margin = 0.5 * cm
+
+        self.cell_size = Cell(
+            (self.width - self.left_margin - self.right_margin) / 31,
+            (self.width - self.left_margin - self.right_margin) / 31 * 0.8
+        )
+        cell_width, cell_height = self.cell_size.width, self.cell_size.height
+        self.month_width = cell_width * 7
+        self.month_height = cell_height * 9
+
+        # three months in a column, four columns with a cell between
+        self.month_origins = [
+            (self.left_margin + (self.month_width + cell_width) * (i // 3),
+             self.month_height * (i % 3))
+            for i in range(12)
+        ]
+        # right edges of day numbers by weekday relative to the month
+        self.day_x = [
+            cell_width * (week_day + 1) - cell_width * 0.15
+            for week_day in range(7)
+        ]
+        # weeks relative to the row of weekday names
+        self.week_y = [cell_height * (week + 1) for week in range(6)]
+        self.weekday_x = [cell_width * (i + 0.5) for i in range(7)]
+
+        self.schedule_x: typing.List[float] = []
+        x = self.left_margin
+        for width in self.SCHEDULE_COLUMNS:
+            x += cell_width * width / 2
+            self.schedule_x.append(x)
+            x += cell_width * width / 2
+
+    def holiday_origin(self, i: int) -> typing.Tuple[float, float]:
+        """
+        Returns location of the i-th holiday relative to the top
+        of the holidays part, three holidays in a column.
+        """
+        return (self.left_margin + self.cell_size.width * 10 * (i // 3),
+                self.cell_size.height * (i % 3))
+
+    def __repr__(self) -> str:
+        return (f"{self.__class__.__qualname__}"
+                f"({self.page_size}, {self.font_size})")
+
+
 class Holiday:
+    __slots__ = ("date", "is_transferable", "name")
+
     def __init__(
             self,
             date: typing.List[datetime.date],
@@ -49,6 +203,924 @@ class Holiday:
                 f"{self.name})")
 
 
+class HolidayRules:
+    """
+    Holidays and per-year weekend transfers loaded from the compiled
+    form of a rules file. The compiled form is memory mapped and
+    decoded lazily, so loading does not depend on the number of years.
+    A holiday is [(month, day), is_transferable, name],
+    a transfer is [weekend ordinal, ordinal of the day off it moves to].
+    """
+    def __init__(self, path: str = RULES_FILE):
+        self.path = path
+        self.data = self.load_compiled()
+        (_, self.version, _, _,
+         country_count) = RULES_HEADER.unpack_from(self.data)
+        # country -> holidays offset and length, first year,
+        # number of years and offset of the year table
+        self.countries: typing.Dict[str, typing.Tuple[int, ...]] = {}
+        for i in range(country_count):
+            code, *entry = RULES_COUNTRY.unpack_from(
+                self.data, RULES_HEADER.size + RULES_COUNTRY.size * i
+            )
+            self.countries[code.rstrip(b"\0").decode()] = tuple(entry)
+
+    def load_compiled(self) -> typing.Union[mmap.mmap, bytes]:
+        """
+        Maps the compiled rules, compiling them first if the cache is
+        missing or was built from a different version of the source.
+        """
+        source = os.stat(self.path)
+        cache_path = self.path + ".cache"
+        try:
+            with open(cache_path, "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, _, mtime, size, _ = RULES_HEADER.unpack_from(data)
+            if (magic, mtime, size) == (
+                    RULES_MAGIC, source.st_mtime_ns, source.st_size):
+                return data
+            data.close()
+        except (OSError, ValueError, struct.error):
+            pass
+
+        data = compile_rules(self.path, source.st_mtime_ns, source.st_size)
+        try:
+            temporary_path = f"{cache_path}.{os.getpid()}"
+            with open(temporary_path, "wb") as file:
+                file.write(data)
+            os.replace(temporary_path, cache_path)
+        except OSError:
+            # read-only location, use the rules compiled in memory
+            pass
+        return data
+
+    def country(self, country: str) -> typing.Tuple[int, ...]:
+        if country not in self.countries:
+            raise KeyError(f"No holiday rules for country {country}")
+        return self.countries[country]
+
+    def holidays(self, country: str) -> typing.List[list]:
+        offset, length, *_ = self.country(country)
+        return marshal.loads(self.data[offset:offset + length])
+
+    def weekend_transfer(self, country: str, year: int) -> typing.List[list]:
+        _, _, first_year, year_count, table = self.country(country)
+        if not 0 <= year - first_year < year_count:
+            return []
+        offset, length = RULES_YEAR.unpack_from(
+            self.data, table + RULES_YEAR.size * (year - first_year)
+        )
+        if not length:
+            return []
+        return marshal.loads(self.data[offset:offset + length])
+
+
+class Instrumentation:
+    """
+    Collects wall time of setup and rendering stages, number of drawing
+    calls made by every stage and size of the produced PDF.
+    Results are available by as_dict() and dump() or passed to
+    the callback once a calendar has been rendered.
+    """
+    COUNTED_CALLS = (
+        "drawCentredString",
+        "drawRightString",
+        "drawString",
+        "drawText",
+        "setFillColor",
+        "line",
+    )
+
+    def __init__(
+            self,
+            callback: typing.Optional[typing.Callable[[dict], None]] = None
+    ):
+        self.callback = callback
+        self.stages: typing.Dict[str, float] = {}
+        self.calls: typing.Dict[str, typing.Dict[str, int]] = {}
+        self.output_size: typing.Optional[int] = None
+        self.stage: typing.Optional[str] = None
+        # canvases are held weakly, an id could be reused by a new one
+        self.instrumented: "weakref.WeakSet" = weakref.WeakSet()
+        # number of counted calls in progress
+        self.depth = 0
+
+    @contextlib.contextmanager
+    def measure(self, stage: str) -> typing.Iterator[None]:
+        """
+        Accounts time and drawing calls of the enclosed code to the stage.
+        """
+        outer_stage, self.stage = self.stage, stage
+        self.calls.setdefault(stage, dict.fromkeys(self.COUNTED_CALLS, 0))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] = (self.stages.get(stage, 0.0)
+                                  + time.perf_counter() - start)
+            self.stage = outer_stage
+
+    def instrument(self, pdf: "canvas.Canvas") -> None:
+        """
+        Makes the canvas count its drawing calls.
+        """
+        if pdf in self.instrumented:
+            return
+        self.instrumented.add(pdf)
+        for name in self.COUNTED_CALLS:
+            setattr(pdf, name, self.counted(name, getattr(pdf, name)))
+
+    def counted(self, name: str, method: typing.Callable) -> typing.Callable:
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            # calls the canvas makes itself, such as drawText
+            # by drawString, are not counted
+            if self.stage is not None and not self.depth:
+                self.calls[self.stage][name] += 1
+            self.depth += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.depth -= 1
+        return wrapper
+
+    def as_dict(self) -> dict:
+        return {
+            "stages": dict(self.stages),
+            "calls": {stage: dict(calls)
+                      for stage, calls in self.calls.items()},
+            "output_size": self.output_size,
+        }
+
+    def dump(self) -> str:
+        return json.dumps(self.as_dict())
+
+    def report(self) -> None:
+        if self.callback is not None:
+            self.callback(self.as_dict())
+
+
+class TextBatch:
+    """
+    Strings collected while a part of the page is rendered and drawn
+    as one text object per font, size and color, every string
+    positioned relative to the previous one. Drawing order within
+    the part does not matter as its strings do not overlap.
+    """
+    def __init__(self):
+        # (font, size, color) -> x, y, string
+        self.groups: typing.Dict[
+            typing.Tuple[str, float, "Color"],
+            typing.List[typing.Tuple[float, float, str]]
+        ] = {}
+
+    def add(
+            self,
+            font: str,
+            size: float,
+            color: "Color",
+            x: float,
+            y: float,
+            string: str
+    ) -> None:
+        self.groups.setdefault((font, size, color), []).append((x, y, string))
+
+    def draw(self, pdf: "canvas.Canvas") -> None:
+        """
+        Draws the collected strings and empties the batch.
+        Fill color and font of the canvas are left as they were.
+        """
+        if not self.groups:
+            return
+        pdf.saveState()
+        for (font, size, color), strings in self.groups.items():
+            text = pdf.beginText()
+            text.setFont(font, size)
+            text.setFillColor(color)
+            last_x = last_y = 0.0
+            for x, y, string in strings:
+                text.moveCursor(x - last_x, y - last_y)
+                last_x, last_y = x, y
+                text.textOut(string)
+            pdf.drawText(text)
+        pdf.restoreState()
+        self.groups.clear()
+
+
+class YearSpan:
+    """
+    Day classification of a span of years held in NumPy arrays,
+    one element per day. hours has a column for every WEEK_NORMS entry.
+    holiday_id refers to holiday_names, -1 means the day is not a holiday.
+    """
+    def __init__(
+            self,
+            dates: "np.ndarray",
+            weekday: "np.ndarray",
+            day_type: "np.ndarray",
+            hours: "np.ndarray",
+            holiday_id: "np.ndarray",
+            holiday_names: typing.List[str]
+    ):
+        self.dates = dates
+        self.weekday = weekday
+        self.day_type = day_type
+        self.hours = hours
+        self.holiday_id = holiday_id
+        self.holiday_names = holiday_names
+
+    def __repr__(self) -> str:
+        return (f"{self.__class__.__qualname__}"
+                f"({self.dates[0]}..{self.dates[-1]})")
+
+
+class CompactYear:
+    """
+    Day classification of a year packed into one byte per day:
+    the day type in the two low bits and the 1-based number
+    of its holiday in holidays in the rest, 0 if it is not a holiday.
+    holidays hold (name, is_transferable) in the order
+    they are listed in the rules.
+    """
+    __slots__ = ("year", "country", "days", "holidays")
+
+    TYPE_MASK = 0b11
+    HOLIDAY_SHIFT = 2
+    MAX_HOLIDAYS = 0xFF >> HOLIDAY_SHIFT
+
+    def __init__(
+            self,
+            year: int,
+            country: str,
+            days: bytes,
+            holidays: typing.Tuple[typing.Tuple[str, bool], ...]
+    ):
+        if len(holidays) > self.MAX_HOLIDAYS:
+            raise ValueError(
+                f"At most {self.MAX_HOLIDAYS} holidays fit a compact year"
+            )
+        self.year = year
+        self.country = country
+        self.days = days
+        self.holidays = holidays
+
+    @classmethod
+    def pack(
+            cls,
+            year: int,
+            country: str,
+            day_types: typing.Sequence[int],
+            holiday_ids: typing.Sequence[int],
+            holidays: typing.Tuple[typing.Tuple[str, bool], ...]
+    ) -> "CompactYear":
+        """
+        Packs day types and 0-based holiday numbers, -1 for days
+        which are not holidays.
+        """
+        return cls(year, country, bytes(
+            day_type | (holiday_id + 1) << cls.HOLIDAY_SHIFT
+            for day_type, holiday_id in zip(day_types, holiday_ids)
+        ), holidays)
+
+    @classmethod
+    def from_calendar(cls, calendar: "Calendar") -> "CompactYear":
+        """
+        Packs the day index of a set up calendar.
+        """
+        names = [holiday.name for holiday in calendar.holidays]
+        holiday_ids = [-1] * len(calendar.day_index)
+        for offset, name in calendar.holiday_names.items():
+            holiday_ids[offset] = names.index(name)
+        return cls.pack(
+            calendar.year,
+            calendar.country,
+            calendar.day_index,
+            holiday_ids,
+            tuple((holiday.name, holiday.is_transferable)
+                  for holiday in calendar.holidays)
+        )
+
+    @classmethod
+    def for_years(
+            cls,
+            first_year: int,
+            last_year: int,
+            country: str = "RU"
+    ) -> typing.List["CompactYear"]:
+        """
+        Classifies the years with classify_years and packs every year.
+        """
+        import numpy as np
+
+        span = classify_years(first_year, last_year, country)
+        transferable = {
+            name: bool(is_transferable)
+            for _, is_transferable, name in load_rules().holidays(country)
+        }
+        holidays = tuple(
+            (name, transferable[name]) for name in span.holiday_names
+        )
+        packed = (
+            span.day_type.astype(np.uint8)
+            | ((span.holiday_id + 1) << cls.HOLIDAY_SHIFT).astype(np.uint8)
+        )
+        years = span.dates.astype("datetime64[Y]").astype(np.int64) + 1970
+        bounds = np.searchsorted(
+            years, np.arange(first_year, last_year + 2)
+        ).tolist()
+        return [
+            cls(year, country,
+                packed[bounds[i]:bounds[i + 1]].tobytes(), holidays)
+            for i, year in enumerate(range(first_year, last_year + 1))
+        ]
+
+    def to_bytes(self) -> bytes:
+        parts = [COMPACT_HEADER.pack(
+            COMPACT_MAGIC,
+            self.year,
+            self.country.encode(),
+            len(self.days),
+            len(self.holidays)
+        ), self.days]
+        for name, is_transferable in self.holidays:
+            encoded = name.encode()
+            parts.append(COMPACT_HOLIDAY.pack(is_transferable, len(encoded)))
+            parts.append(encoded)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CompactYear":
+        magic, year, country, day_count, holiday_count = (
+            COMPACT_HEADER.unpack_from(data)
+        )
+        if magic != COMPACT_MAGIC:
+            raise ValueError("Not a compact year")
+        offset = COMPACT_HEADER.size + day_count
+        days = bytes(data[COMPACT_HEADER.size:offset])
+        holidays = []
+        for _ in range(holiday_count):
+            is_transferable, length = COMPACT_HOLIDAY.unpack_from(
+                data, offset
+            )
+            offset += COMPACT_HOLIDAY.size
+            holidays.append((
+                bytes(data[offset:offset + length]).decode(),
+                is_transferable
+            ))
+            offset += length
+        return cls(year, country.rstrip(b"\0").decode(), days, tuple(holidays))
+
+    def offset(self, day: datetime.date) -> int:
+        if day.year != self.year:
+            raise ValueError(f"{day} is not in {self.year}")
+        return day.timetuple().tm_yday - 1
+
+    def day_type(self, day: datetime.date) -> int:
+        return self.days[self.offset(day)] & self.TYPE_MASK
+
+    def holiday_name(self, day: datetime.date) -> typing.Optional[str]:
+        holiday_id = self.days[self.offset(day)] >> self.HOLIDAY_SHIFT
+        if not holiday_id:
+            return None
+        return self.holidays[holiday_id - 1][0]
+
+    def day_types(self) -> bytes:
+        return bytes(day & self.TYPE_MASK for day in self.days)
+
+    def holiday_dates(self) -> typing.List[Holiday]:
+        """
+        Returns holidays of the year with their dates
+        in the form Calendar keeps them.
+        """
+        first_day = datetime.date(self.year, 1, 1)
+        dates: typing.List[typing.List[datetime.date]] = [
+            [] for _ in self.holidays
+        ]
+        for offset, day in enumerate(self.days):
+            if day >> self.HOLIDAY_SHIFT:
+                dates[(day >> self.HOLIDAY_SHIFT) - 1].append(
+                    first_day + datetime.timedelta(days=offset)
+                )
+        return [
+            Holiday(date=holiday_dates, is_transferable=is_transferable,
+                    name=name)
+            for (name, is_transferable), holiday_dates
+            in zip(self.holidays, dates)
+        ]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompactYear):
+            return NotImplemented
+        return ((self.year, self.country, self.days, self.holidays)
+                == (other.year, other.country, other.days, other.holidays))
+
+    def __repr__(self) -> str:
+        return (f"{self.__class__.__qualname__}"
+                f"({self.year}, {self.country})")
+
+
+class OutputCache:
+    """
+    Content-addressed store of rendered calendars. A calendar is stored
+    under a hash of everything its PDF depends on, so an unchanged
+    calendar is copied from the store instead of being rendered.
+    The least recently used files are evicted once the store
+    grows over size_limit bytes.
+    """
+    def __init__(
+            self,
+            directory: str = OUTPUT_CACHE_DIR,
+            size_limit: int = 256 * 1024 * 1024
+    ):
+        self.directory = directory
+        self.size_limit = size_limit
+
+    def key(self, calendar: "Calendar") -> str:
+        """
+        Returns the hash of the calendar inputs: year, country, its
+        holidays and transfers of the year, page size, fonts, locale
+        and version of this module.
+        """
+        rules = load_rules()
+        digest = hashlib.sha256(code_version().encode())
+        digest.update(repr((
+            calendar.year,
+            calendar.country,
+            calendar.page_size,
+            calendar.font,
+            calendar.font_size,
+            calendar.locale,
+            rules.holidays(calendar.country),
+            rules.weekend_transfer(calendar.country, calendar.year),
+        )).encode())
+        for font in sorted(FONT_FILES.values()):
+            with contextlib.suppress(OSError):
+                stat = os.stat(font)
+                digest.update(f"{font}:{stat.st_size}:"
+                              f"{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".pdf")
+
+    def get(self, key: str, output: str) -> bool:
+        """
+        Copies the stored calendar to output if there is one.
+        Returns whether it has been found.
+        """
+        path = self.path(key)
+        try:
+            shutil.copyfile(path, output)
+            # the access time of files is not reliable, so the
+            # modification time marks the recent use
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put(self, key: str, output: str) -> None:
+        """
+        Stores a rendered calendar and evicts files over the size limit.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temporary_path = f"{self.path(key)}.{os.getpid()}"
+            shutil.copyfile(output, temporary_path)
+            os.replace(temporary_path, self.path(key))
+            self.evict()
+        except OSError:
+            # read-only location, the calendar is rendered next time
+            pass
+
+    def evict(self) -> None:
+        entries = []
+        with os.scandir(self.directory) as files:
+            for entry in files:
+                if entry.name.endswith(".pdf"):
+                    with contextlib.suppress(FileNotFoundError):
+                        stat = entry.stat()
+                        entries.append(
+                            (stat.st_mtime_ns, stat.st_size, entry.path)
+                        )
+        size = sum(file_size for _, file_size, _ in entries)
+        for _, file_size, path in sorted(entries):
+            if size <= self.size_limit:
+                break
+            # another process may be evicting at the same time
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            size -= file_size
+
+
+class RuleEngine:
+    """
+    Resolves day classification of a year in a region once and keeps
+    results of recently used (region, year) pairs in a bounded cache
+    shared by all calendars and threads. A region is a code of the rules
+    file, a region with a parent inherits its holidays and transfers.
+    Regions are resolved by the rules file unless another resolver
+    is registered for them.
+    """
+    def __init__(self, cache_size: int = 1024):
+        self.cache: typing.OrderedDict[
+            typing.Tuple[str, int], CompactYear
+        ] = OrderedDict()
+        self.cache_size = cache_size
+        self.resolvers: typing.Dict[
+            str, typing.Callable[[str, int], CompactYear]
+        ] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def resolve_rules(region: str, year: int) -> CompactYear:
+        return CompactYear.for_years(year, year, region)[0]
+
+    def register(
+            self,
+            region: str,
+            resolver: typing.Callable[[str, int], CompactYear]
+    ) -> None:
+        """
+        Makes the resolver classify years of the region and drops
+        the region from the cache.
+        """
+        with self.lock:
+            self.resolvers[region] = resolver
+            for key in [key for key in self.cache if key[0] == region]:
+                del self.cache[key]
+
+    def resolve(self, region: str, year: int) -> CompactYear:
+        """
+        Returns classification of the year in the region.
+        """
+        key = (region, year)
+        with self.lock:
+            if key in self.cache:
+                self.hits += 1
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            self.misses += 1
+            resolver = self.resolvers.get(region, self.resolve_rules)
+
+        # resolved outside of the lock, a year resolved concurrently
+        # by another thread is replaced by an equal one
+        compact = resolver(region, year)
+        with self.lock:
+            self.cache[key] = compact
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return compact
+
+    def clear(self) -> None:
+        with self.lock:
+            self.cache.clear()
+
+
+# shared by all calendars of the process
+rule_engine = RuleEngine()
+
+
+class WorkingDays:
+    """
+    Business day arithmetic over a continuous range of classified days.
+    Working and shortened work days are working days.
+    Range counts are taken from prefix sums, the nearest working day
+    is found by bisecting a sorted list of days off.
+    """
+    def __init__(
+            self,
+            first_day: datetime.date,
+            day_types: typing.Sequence[int]
+    ):
+        self.first_ordinal = first_day.toordinal()
+        self.size = len(day_types)
+        is_working = [day_type <= SHORTENED_DAY for day_type in day_types]
+        # prefix[i] is a number of working days among the first i days
+        self.prefix = [0]
+        self.prefix.extend(itertools.accumulate(is_working))
+
+        # sorted ordinals of days off and ordinals of the first and
+        # the last day of the run of days off each of them belongs to
+        self.days_off: typing.List[int] = []
+        self.run_start: typing.List[int] = []
+        self.run_end: typing.List[int] = []
+        run_start = 0
+        for offset, working in enumerate(is_working):
+            if working:
+                continue
+            ordinal = self.first_ordinal + offset
+            if not self.days_off or self.days_off[-1] != ordinal - 1:
+                run_start = ordinal
+            self.days_off.append(ordinal)
+            self.run_start.append(run_start)
+        run_end = 0
+        for i in reversed(range(len(self.days_off))):
+            if (i + 1 == len(self.days_off)
+                    or self.days_off[i + 1] != self.days_off[i] + 1):
+                run_end = self.days_off[i]
+            self.run_end.append(run_end)
+        self.run_end.reverse()
+
+    @classmethod
+    def from_calendar(cls, calendar: "Calendar") -> "WorkingDays":
+        """
+        Creates business day arithmetic for a year
+        that has been set up by Calendar.setup.
+        :param calendar:
+        :return:
+        """
+        return cls(datetime.date(calendar.year, 1, 1), calendar.day_index)
+
+    @classmethod
+    def for_years(cls, first_year: int, last_year: int) -> "WorkingDays":
+        """
+        Creates business day arithmetic for a span of years
+        classified by classify_years.
+        :param first_year:
+        :param last_year:
+        :return:
+        """
+        span = classify_years(first_year, last_year)
+        return cls(datetime.date(first_year, 1, 1), span.day_type.tolist())
+
+    def offset(self, day: datetime.date, inclusive_end: bool = False) -> int:
+        """
+        Returns position of the day in the range.
+        Raises ValueError if the day is not classified.
+        :param day:
+        :param inclusive_end: allows the day right after the range
+        :return:
+        """
+        offset = day.toordinal() - self.first_ordinal
+        if not 0 <= offset < self.size + inclusive_end:
+            raise ValueError(f"{day} is outside of the classified range")
+        return offset
+
+    def is_working_day(self, day: datetime.date) -> bool:
+        """
+        Checks if the day is a working or shortened work day.
+        :param day:
+        :return:
+        """
+        offset = self.offset(day)
+        return self.prefix[offset + 1] != self.prefix[offset]
+
+    def workdays_between(
+            self,
+            start: datetime.date,
+            end: datetime.date
+    ) -> int:
+        """
+        Counts working days from start (inclusive) to end (exclusive).
+        The result is negative if end precedes start.
+        :param start:
+        :param end:
+        :return:
+        """
+        return (self.prefix[self.offset(end, inclusive_end=True)]
+                - self.prefix[self.offset(start, inclusive_end=True)])
+
+    def next_working_day(self, day: datetime.date) -> datetime.date:
+        """
+        Returns the first working day after the day.
+        :param day:
+        :return:
+        """
+        ordinal = day.toordinal() + 1
+        i = bisect.bisect_left(self.days_off, ordinal)
+        if i < len(self.days_off) and self.days_off[i] == ordinal:
+            ordinal = self.run_end[i] + 1
+        result = datetime.date.fromordinal(ordinal)
+        self.offset(result)
+        return result
+
+    def prev_working_day(self, day: datetime.date) -> datetime.date:
+        """
+        Returns the last working day before the day.
+        :param day:
+        :return:
+        """
+        ordinal = day.toordinal() - 1
+        i = bisect.bisect_left(self.days_off, ordinal)
+        if i < len(self.days_off) and self.days_off[i] == ordinal:
+            ordinal = self.run_start[i] - 1
+        result = datetime.date.fromordinal(ordinal)
+        self.offset(result)
+        return result
+
+    def add_workdays(self, day: datetime.date, count: int) -> datetime.date:
+        """
+        Returns the date which is count working days after the day
+        or before it if count is negative. The day itself is not counted.
+        :param day:
+        :param count:
+        :return:
+        """
+        offset = self.offset(day)
+        if count > 0:
+            position = bisect.bisect_left(
+                self.prefix, self.prefix[offset + 1] + count
+            )
+        elif count < 0:
+            target = self.prefix[offset] + count
+            position = bisect.bisect_left(self.prefix, target + 1)
+            if target < 0:
+                position = 0
+        else:
+            return day
+        if not 0 < position <= self.size:
+            raise ValueError(
+                f"{day} shifted by {count} working days "
+                f"is outside of the classified range"
+            )
+        return datetime.date.fromordinal(self.first_ordinal + position - 1)
+
+
+class Totals:
+    """
+    Working time of a period: calendar days, working days (including
+    shortened ones), weekends and holidays, shortened work days
+    and working hours for every WEEK_NORMS entry.
+    """
+    def __init__(
+            self,
+            days: int,
+            work_days: int,
+            holidays: int,
+            short_days: int
+    ):
+        self.days = days
+        self.work_days = work_days
+        self.holidays = holidays
+        self.short_days = short_days
+        self.hours = [
+            work_days * day_hours(norm) - short_days for norm in WEEK_NORMS
+        ]
+
+    def __repr__(self) -> str:
+        return (f"{self.__class__.__qualname__}"
+                f"({self.days}, "
+                f"{self.work_days}, "
+                f"{self.holidays}, "
+                f"{self.short_days})")
+
+
+class Norms:
+    """
+    Norm hours of a number of employees for every month of a year
+    (an array of employees by 12 months), every quarter (by 4 quarters)
+    and the whole year.
+    """
+    def __init__(self, months: "np.ndarray"):
+        self.months = months
+        self.quarters = months.reshape(len(months), 4, 3).sum(axis=2)
+        self.year = months.sum(axis=1)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__qualname__}({len(self.months)})"
+
+
+class WorkingTime(WorkingDays):
+    """
+    Aggregates working time over arbitrary periods of the classified
+    range. Every query takes constant time using cumulative counts.
+    """
+    def __init__(
+            self,
+            first_day: datetime.date,
+            day_types: typing.Sequence[int]
+    ):
+        super().__init__(first_day, day_types)
+        # cumulative counts of shortened work days and days off
+        self.short_prefix = [0]
+        self.short_prefix.extend(itertools.accumulate(
+            day_type == SHORTENED_DAY for day_type in day_types
+        ))
+        self.off_prefix = [0]
+        self.off_prefix.extend(itertools.accumulate(
+            day_type >= WEEKEND for day_type in day_types
+        ))
+
+    def totals(self, start: datetime.date, end: datetime.date) -> Totals:
+        """
+        Returns working time from start (inclusive) to end (exclusive).
+        :param start:
+        :param end:
+        :return:
+        """
+        first = self.offset(start, inclusive_end=True)
+        last = self.offset(end, inclusive_end=True)
+        return Totals(
+            days=last - first,
+            work_days=self.prefix[last] - self.prefix[first],
+            holidays=self.off_prefix[last] - self.off_prefix[first],
+            short_days=self.short_prefix[last] - self.short_prefix[first]
+        )
+
+    def months(self, year: int, month: int, count: int) -> Totals:
+        """
+        Returns working time of count months starting with the month.
+        :param year:
+        :param month:
+        :param count:
+        :return:
+        """
+        end_year, end_month = divmod(year * 12 + month - 1 + count, 12)
+        return self.totals(
+            datetime.date(year, month, 1),
+            datetime.date(end_year, end_month + 1, 1)
+        )
+
+    def month(self, year: int, month: int) -> Totals:
+        return self.months(year, month, 1)
+
+    def quarter(self, year: int, quarter: int) -> Totals:
+        return self.months(year, quarter * 3 - 2, 3)
+
+    def half_year(self, year: int, half: int) -> Totals:
+        return self.months(year, half * 6 - 5, 6)
+
+    def year(self, year: int) -> Totals:
+        return self.months(year, 1, 12)
+
+    def fiscal_year(self, year: int, start_month: int = 1) -> Totals:
+        """
+        Returns working time of a fiscal year which starts
+        on the first day of start_month of the year.
+        :param year:
+        :param start_month:
+        :return:
+        """
+        return self.months(year, start_month, 12)
+
+    def iso_week(self, year: int, week: int) -> Totals:
+        """
+        Returns working time of an ISO 8601 week.
+        :param year:
+        :param week:
+        :return:
+        """
+        monday = datetime.date.fromisocalendar(year, week, 1)
+        return self.totals(monday, monday + datetime.timedelta(days=7))
+
+    def norms(
+            self,
+            year: int,
+            weekly_hours: typing.Sequence[float],
+            start: typing.Optional[typing.Sequence[datetime.date]] = None,
+            end: typing.Optional[typing.Sequence[datetime.date]] = None
+    ) -> Norms:
+        """
+        Computes norm hours of employees at once. An employee works
+        weekly_hours / 5 hours a working day and an hour less a shortened
+        one, as render_schedule counts, from their start to their end
+        date inclusive, the whole year if they are not given.
+        Dates may be datetime.date or numpy.datetime64 values.
+        :param year:
+        :param weekly_hours:
+        :param start:
+        :param end:
+        :return:
+        """
+        import numpy as np
+
+        month_bounds = np.array([
+            self.offset(datetime.date(year, month, 1), inclusive_end=True)
+            for month in range(1, 13)
+        ] + [self.offset(datetime.date(year + 1, 1, 1), inclusive_end=True)])
+        hours = np.asarray(weekly_hours, dtype=float)
+        count = len(hours)
+        first_ordinal = np.datetime64(
+            datetime.date.fromordinal(self.first_ordinal), "D"
+        )
+        if start is None:
+            first = np.full(count, month_bounds[0])
+        else:
+            first = (np.asarray(start, dtype="datetime64[D]")
+                     - first_ordinal).astype(np.int64)
+        if end is None:
+            last = np.full(count, month_bounds[-1])
+        else:
+            last = (np.asarray(end, dtype="datetime64[D]")
+                    - first_ordinal).astype(np.int64) + 1
+
+        # employment of every employee clipped to every month
+        first = np.clip(first[:, None], month_bounds[:-1], month_bounds[1:])
+        last = np.clip(last[:, None], first, month_bounds[1:])
+        prefix = np.asarray(self.prefix)
+        short_prefix = np.asarray(self.short_prefix)
+        work_days = prefix[last] - prefix[first]
+        short_days = short_prefix[last] - short_prefix[first]
+        day_hours = hours[:, None] / 5
+        # a shortened work day is not shorter than no work at all
+        return Norms(
+            work_days * day_hours
+            - short_days * np.minimum(day_hours, 1)
+        )
+
+
 class Calendar:
     def __init__(
             self,
@@ -57,60 +1129,152 @@ class Calendar:
             font: str = 'CalibriB',
             font_size: int = 12,
             locale: str = 'Russian_Russia',
+            country: str = 'RU',
+            output: typing.Union[str, typing.BinaryIO, None] = None,
+            pdf: typing.Optional["canvas.Canvas"] = None,
+            instrumentation: typing.Optional[Instrumentation] = None,
     ):
         self.year = year
-        self.top_margin = 1 * cm
-        self.bottom_margin = 1 * cm
-        self.left_margin = 0.5 * cm
-        self.right_margin = 0.5 * cm
         self.page_size = page_size
         self.width, self.height = self.page_size
         self.font = font
         self.font_size = font_size
         self.locale = locale
-        self.pdf = canvas.Canvas(
-            f"Calendar_{self.year}.pdf",
-            pagesize=self.page_size,
-            bottomup=False
-        )
-
-        self.cell_size = Cell(
-            (self.width - self.left_margin - self.right_margin) / 31,
-            (self.width - self.left_margin - self.right_margin) / 31 * 0.8
-        )
-        self.month_width = self.cell_size.width * 7
-        self.month_height = self.cell_size.height * 9
+        self.country = country
+        # file name or any writable binary object the PDF is saved to
+        self.output = output
+        if self.output is None:
+            self.output = f"Calendar_{self.year}.pdf"
+        # a canvas shared with other calendars, the year is rendered
+        # as its next page and saving is left to the owner
+        self.pdf = pdf
+        self.shares_pdf = pdf is not None
+        self.instrumentation = instrumentation
+        self.text_batch = TextBatch()
+
+        self.layout = page_layout(self.page_size, self.font_size)
+        self.top_margin = self.layout.top_margin
+        self.bottom_margin = self.layout.bottom_margin
+        self.left_margin = self.layout.left_margin
+        self.right_margin = self.layout.right_margin
+        self.cell_size = self.layout.cell_size
+        self.month_width = self.layout.month_width
+        self.month_height = self.layout.month_height
 
         self.c = calendar.LocaleTextCalendar(locale=self.locale)
 
         self.working_days: typing.List[datetime.date] = []
 
-        # month, day, is_transferrable (defines if holiday
+        rules = load_rules()
+        # (month, day), is_transferrable (defines if holiday
         # is transferred when concurs with weekend), name
-        self.holidays: Holiday = [
-            ["1-1", 0, "Новогодние каникулы"],
-            ["1-2", 0, "Новогодние каникулы"],
-            ["1-3", 0, "Новогодние каникулы"],
-            ["1-4", 0, "Новогодние каникулы"],
-            ["1-5", 0, "Новогодние каникулы"],
-            ["1-6", 0, "Новогодние каникулы"],
-            ["1-7", 0, "Рождество Христово"],
-            ["1-8", 0, "Новогодние каникулы"],
-            ["2-23", 1, "День защитника Отечества"],
-            ["3-8", 1, "Международный женский день"],
-            ["5-1", 1, "Праздник Весны и Труда"],
-            ["5-9", 1, "День Победы"],
-            ["6-12", 1, "День России"],
-            ["11-4", 1, "День народного единства"]]
+        self.holidays: Holiday = rules.holidays(self.country)
 
         self.weekends: typing.Set[datetime.date] = set()
 
+        # one entry per day of the year holding its day type,
+        # filled by build_day_index() once the year is set up
+        self.day_index = bytearray()
+        # day of the year (0-based) -> holiday name
+        self.holiday_names: typing.Dict[int, str] = {}
+        # offsets of the first day of every month in day_index,
+        # the 13th entry is the length of the year
+        self.month_offsets: typing.List[int] = []
+        self.first_ordinal = datetime.date(self.year, 1, 1).toordinal()
+
         self.shortened_work_day: typing.Set[datetime.date] = set()
 
-        self.weekend_transfer = [
-            ["2023-1-1", "2023-2-24"],
-            ["2023-1-8", "2023-5-8"],
-        ]
+        # weekend day, day it is transferred to
+        self.weekend_transfer = rules.weekend_transfer(self.country, year)
+
+    def measure(self, stage: str) -> typing.ContextManager:
+        """
+        Measures the enclosed stage if the calendar is instrumented.
+        :param stage:
+        :return:
+        """
+        if self.instrumentation is None:
+            return contextlib.nullcontext()
+        return self.instrumentation.measure(stage)
+
+    def set_font(self, font: str, size: float) -> None:
+        """
+        Sets font of the canvas registering it first if it is
+        the first use of the font in the process.
+        :param font:
+        :param size:
+        :return:
+        """
+        register_font(font)
+        self.pdf.setFont(font, size)
+
+    def draw_string(
+            self,
+            x: float,
+            y: float,
+            string: str,
+            color: "Color",
+            align: str = "left"
+    ) -> None:
+        """
+        Adds a string in the current font of the canvas to the text batch.
+        align is "left", "right" or "centre" as drawString,
+        drawRightString and drawCentredString place strings.
+        The batch is drawn by draw_text_batch().
+        :param x:
+        :param y:
+        :param string:
+        :param color:
+        :param align:
+        :return:
+        """
+        font, size = self.pdf._fontname, self.pdf._fontsize
+        if align != "left":
+            width = self.pdf.stringWidth(string, font, size)
+            x -= width if align == "right" else width * 0.5
+        self.text_batch.add(font, size, color, x, y, string)
+
+    def draw_text_batch(self) -> None:
+        """
+        Draws strings added by draw_string().
+        :return:
+        """
+        self.text_batch.draw(self.pdf)
+
+    def draw_form(
+            self,
+            name: str,
+            x: float,
+            y: float,
+            draw: typing.Callable[[], None]
+    ) -> None:
+        """
+        Places static content at x, y. The content is drawn by draw()
+        relative to the origin only once per canvas and is referenced
+        as a form XObject afterwards.
+        :param name:
+        :param x:
+        :param y:
+        :param draw:
+        :return:
+        """
+        name = f"{name}_{self.font}_{self.font_size}_{round(self.width)}"
+        if not self.pdf.hasForm(name):
+            self.pdf.beginForm(
+                name,
+                -self.width, -self.height,
+                self.width, self.height
+            )
+            # forms begin with the same top-down flip as pages, while
+            # they are placed within the already flipped page, so
+            # the flip is reverted
+            self.pdf.transform(1, 0, 0, -1, 0, self.height)
+            draw()
+            self.pdf.endForm()
+        self.pdf.saveState()
+        self.pdf.translate(x, y)
+        self.pdf.doForm(name)
+        self.pdf.restoreState()
 
     def draw_horizontal_line(self, y: float) -> None:
         """
@@ -145,7 +1309,7 @@ class Calendar:
             pos_y: float,
             text: typing.Union[typing.List[object], object],
             parameter: typing.Union[int, list],
-            color: str = black
+            color: typing.Optional["Color"] = None
     ) -> None:
         """
         Determines a color, performs character formatting
@@ -159,37 +1323,342 @@ class Calendar:
         """
         if type(parameter) == list:
             parameter = parameter[0]
-        self.pdf.setFillColor(color)
+        if color is None:
+            color = black
         if type(text[parameter]) is float:
             string = f"{text[parameter]:.1f}"
-            self.pdf.drawCentredString(pos_x, pos_y, string)
-            return
-        self.pdf.drawCentredString(
-            pos_x,
-            pos_y,
-            str(text[parameter])
-        )
+        else:
+            string = str(text[parameter])
+        self.draw_string(pos_x, pos_y, string, color, "centre")
 
-    def is_special_day(self, day: datetime.date) -> Color:
+    def day_offset(self, day: datetime.date) -> int:
         """
-        Checks if a day is in holiday, weekend
-        or shortened work day lists and returns
+        Returns position of the day in the day index.
+        :param day:
+        :return:
+        """
+        return day.toordinal() - self.first_ordinal
+
+    def day_type(self, day: datetime.date) -> int:
+        """
+        Returns type of the day (WORKING_DAY, SHORTENED_DAY,
+        WEEKEND or HOLIDAY) looked up in the day index.
+        :param day:
+        :return:
+        """
+        return self.day_index[self.day_offset(day)]
+
+    def holiday_name(self, day: datetime.date) -> typing.Optional[str]:
+        """
+        Returns name of the holiday the day belongs to or None.
+        :param day:
+        :return:
+        """
+        return self.holiday_names.get(self.day_offset(day))
+
+    def is_special_day(self, day: datetime.date) -> "Color":
+        """
+        Checks if a day is a holiday, weekend
+        or shortened work day and returns
         corresponding color for the day type.
         Returns black color if not.
         :param day:
         :return:
         """
-        # search in list of lists
-        if day in [
-            date for holiday in self.holidays for date in holiday.date
-        ]:
-            return HexColor(0x990000)
-        if day in self.weekends:
-            return red
-        if day in self.shortened_work_day:
-            return green
-        self.working_days.append(day)
-        return black
+        return DAY_COLORS[self.day_type(day)]
+
+    def build_day_index(self) -> None:
+        """
+        Builds the day index out of holidays, weekends and
+        shortened work days, so any further lookup or count
+        does not need to scan these collections.
+        :return:
+        """
+        start_date = datetime.date(self.year, 1, 1)
+        self.month_offsets = [
+            datetime.date(self.year, month, 1).toordinal()
+            - self.first_ordinal
+            for month in range(1, 13)
+        ]
+        self.month_offsets.append(
+            datetime.date(self.year + 1, 1, 1).toordinal()
+            - self.first_ordinal
+        )
+        self.day_index = bytearray(self.month_offsets[-1])
+        self.holiday_names = {}
+
+        # later assignments override earlier ones which gives
+        # holiday > weekend > shortened work day priority
+        for day_type, dates in (
+                (SHORTENED_DAY, self.shortened_work_day),
+                (WEEKEND, self.weekends),
+        ):
+            for date in dates:
+                if date.year == self.year:
+                    self.day_index[self.day_offset(date)] = day_type
+        for holiday in self.holidays:
+            for date in holiday.date:
+                offset = self.day_offset(date)
+                self.day_index[offset] = HOLIDAY
+                self.holiday_names[offset] = holiday.name
+
+        self.working_days = [
+            start_date + datetime.timedelta(days=offset)
+            for offset, day_type in enumerate(self.day_index)
+            if day_type == WORKING_DAY
+        ]
+
+    def compact(self) -> CompactYear:
+        """
+        Returns the day index of the set up year packed into a CompactYear.
+        :return:
+        """
+        return CompactYear.from_calendar(self)
+
+    @classmethod
+    def from_compact(
+            cls,
+            compact: CompactYear,
+            **kwargs
+    ) -> "Calendar":
+        """
+        Creates a set up calendar of a packed year ready to be rendered
+        without computing the year again. Keyword arguments are
+        passed to the constructor.
+        :param compact:
+        :param kwargs:
+        :return:
+        """
+        self = cls(compact.year, country=compact.country, **kwargs)
+        self.load_compact(compact)
+        return self
+
+    def resolve(self) -> None:
+        """
+        Sets the year up from its classification resolved by the shared
+        rule engine, so the year is computed once for all calendars.
+        :return:
+        """
+        self.load_compact(rule_engine.resolve(self.country, self.year))
+
+    def load_compact(self, compact: CompactYear) -> None:
+        """
+        Sets the year up from a packed classification of it replacing
+        any previous set up. Weekend transfers are taken from the rules
+        file, as the packed year does not hold them.
+        :param compact:
+        :return:
+        """
+        self.holidays = compact.holiday_dates()
+        self.weekend_transfer = [
+            [datetime.date.fromordinal(weekend),
+             datetime.date.fromordinal(day_off)]
+            for weekend, day_off in load_rules().weekend_transfer(
+                self.country, self.year
+            )
+        ]
+        self.weekends.clear()
+        self.shortened_work_day.clear()
+        self.build_day_index()
+        self.day_index = bytearray(compact.day_types())
+        start_date = datetime.date(self.year, 1, 1)
+        days: typing.Dict[int, typing.Set[datetime.date]] = {
+            SHORTENED_DAY: self.shortened_work_day,
+            WEEKEND: self.weekends,
+        }
+        self.working_days = []
+        for offset, day_type in enumerate(self.day_index):
+            date = start_date + datetime.timedelta(days=offset)
+            if day_type == WORKING_DAY:
+                self.working_days.append(date)
+            elif day_type in days:
+                days[day_type].add(date)
+
+    def reclassify(
+            self,
+            changed: typing.Iterable[datetime.date]
+    ) -> typing.List[int]:
+        """
+        Recomputes types of the days a change of holidays or weekend
+        transfers on the changed dates can affect: the day before each
+        of them (shortened work day) and three days after it (transferred
+        holiday), further along holidays transferred in turn.
+        Updates the day index and the day sets accordingly.
+        Returns months whose working time has changed.
+        :param changed:
+        :return:
+        """
+        holidays = {
+            date: holiday
+            for holiday in self.holidays for date in holiday.date
+        }
+        # transfers are applied in order, so the last one mentioning
+        # a day decides whether it is a weekend
+        transferred: typing.Dict[datetime.date, bool] = {}
+        for weekend, day_off in self.weekend_transfer:
+            transferred[weekend] = False
+            transferred[day_off] = True
+
+        def is_base_weekend(day: datetime.date) -> bool:
+            return transferred.get(day, day.weekday() in (5, 6))
+
+        def was_weekend(day: datetime.date) -> bool:
+            # a weekend before a holiday on it is taken into account
+            if is_base_weekend(day):
+                return True
+            # a transferable holiday on a weekend within three days
+            # before, moved to the next day which is not Saturday or Sunday
+            for shift in (1, 2, 3):
+                date = day - datetime.timedelta(days=shift)
+                if (date in holidays and holidays[date].is_transferable
+                        and date.year == day.year
+                        and shift == {4: 3, 5: 2}.get(date.weekday(), 1)
+                        and was_weekend(date)):
+                    return True
+            return False
+
+        # a change spreads to the day before and three days after,
+        # further if one of them is a holiday moved in turn
+        days: typing.Set[datetime.date] = set()
+        pending = list(changed)
+        while pending:
+            date = pending.pop()
+            for shift in range(-1, 4):
+                day = date + datetime.timedelta(days=shift)
+                if day not in days:
+                    days.add(day)
+                    if shift > 0 and day in holidays:
+                        pending.append(day)
+
+        months = {day.month for day in days if day.year == self.year}
+        before = {month: self.month_totals(month) for month in months}
+
+        for day in sorted(days):
+            if day.year != self.year:
+                continue
+            offset = self.day_offset(day)
+            next_day = holidays.get(day + datetime.timedelta(days=1))
+            weekend = day not in holidays and was_weekend(day)
+            if day in holidays:
+                day_type = HOLIDAY
+                self.holiday_names[offset] = holidays[day].name
+            elif weekend:
+                day_type = WEEKEND
+            elif next_day is not None and next_day.is_transferable:
+                day_type = SHORTENED_DAY
+            else:
+                day_type = WORKING_DAY
+            if day_type != HOLIDAY:
+                self.holiday_names.pop(offset, None)
+
+            if weekend:
+                self.weekends.add(day)
+            else:
+                self.weekends.discard(day)
+            if (not weekend and next_day is not None
+                    and next_day.is_transferable):
+                self.shortened_work_day.add(day)
+            else:
+                self.shortened_work_day.discard(day)
+
+            if self.day_index[offset] == WORKING_DAY != day_type:
+                self.working_days.remove(day)
+            elif self.day_index[offset] != WORKING_DAY == day_type:
+                bisect.insort(self.working_days, day)
+            self.day_index[offset] = day_type
+
+        return sorted(
+            month for month in months
+            if self.month_totals(month) != before[month]
+        )
+
+    def month_totals(self, month: int) -> typing.List[int]:
+        """
+        Counts days of every type in a month of the day index.
+        :param month:
+        :return:
+        """
+        days = self.day_index[
+            self.month_offsets[month - 1]:self.month_offsets[month]
+        ]
+        return [days.count(day_type) for day_type in range(len(DAY_TYPE_NAMES))]
+
+    def add_holiday(
+            self,
+            date: datetime.date,
+            name: str,
+            is_transferable: bool = True
+    ) -> typing.List[int]:
+        """
+        Adds a holiday to a set up calendar joining a holiday with
+        the same name. Returns months whose working time has changed.
+        :param date:
+        :param name:
+        :param is_transferable:
+        :return:
+        """
+        for holiday in self.holidays:
+            if holiday.name == name:
+                holiday.date.append(date)
+                break
+        else:
+            self.holidays.append(Holiday(
+                date=[date], is_transferable=is_transferable, name=name
+            ))
+        return self.reclassify([date])
+
+    def remove_holiday(self, date: datetime.date) -> typing.List[int]:
+        """
+        Removes a holiday date from a set up calendar.
+        Returns months whose working time has changed.
+        :param date:
+        :return:
+        """
+        for holiday in self.holidays:
+            if date in holiday.date:
+                holiday.date.remove(date)
+                if not holiday.date:
+                    self.holidays.remove(holiday)
+                break
+        else:
+            raise ValueError(f"{date} is not a holiday")
+        return self.reclassify([date])
+
+    def add_weekend_transfer(
+            self,
+            weekend: datetime.date,
+            day_off: datetime.date
+    ) -> typing.List[int]:
+        """
+        Makes the weekend a working day and the day_off a weekend
+        in a set up calendar. Returns months whose working time
+        has changed.
+        :param weekend:
+        :param day_off:
+        :return:
+        """
+        self.weekend_transfer.append([weekend, day_off])
+        return self.reclassify([weekend, day_off])
+
+    def remove_weekend_transfer(
+            self,
+            weekend: datetime.date,
+            day_off: datetime.date
+    ) -> typing.List[int]:
+        """
+        Cancels a weekend transfer of a set up calendar.
+        Returns months whose working time has changed.
+        :param weekend:
+        :param day_off:
+        :return:
+        """
+        try:
+            self.weekend_transfer.remove([weekend, day_off])
+        except ValueError:
+            raise ValueError(
+                f"There is no transfer from {weekend} to {day_off}"
+            ) from None
+        return self.reclassify([weekend, day_off])
 
     def render_day(
             self,
@@ -208,43 +1677,51 @@ class Calendar:
         :return:
         """
         if day.month != month:
-            self.pdf.setFillColor(lightgrey)
+            color = lightgrey
         else:
             color = self.is_special_day(day)
-            self.pdf.setFillColor(color)
-        self.pdf.drawRightString(x, y, str(day.day))
-        self.pdf.setFillColor(black)
+        self.draw_string(x, y, str(day.day), color, "right")
 
-    def render_week(self, x: float, y: float, month: int) -> None:
+    def render_weekdays(self) -> None:
         """
-        Renders every week. Calculates a location for every day in a month
-        and passes control further to "day" part.
-        :param x:
-        :param y:
-        :param month:
+        Renders abbreviated weekday names heading every month.
         :return:
         """
+        self.set_font(self.font, self.font_size)
         for i in range(0, 7):
             if i > 4:
                 self.pdf.setFillColor(red)
             else:
                 self.pdf.setFillColor(black)
             self.pdf.drawCentredString(
-                x + self.cell_size.width * (i + 0.5),
-                y,
+                self.layout.weekday_x[i],
+                0,
                 calendar.day_abbr[i]
             )
-        y += self.cell_size.height
+
+    def render_week(self, x: float, y: float, month: int) -> None:
+        """
+        Renders every week. Calculates a location for every day in a month
+        and passes control further to "day" part.
+        :param x:
+        :param y:
+        :param month:
+        :return:
+        """
+        self.draw_form("weekdays", x, y, self.render_weekdays)
+        day_x = self.layout.day_x
+        week_y = self.layout.week_y
+        week = 0
         for day in self.c.itermonthdates(self.year, month):
             week_day = day.weekday()
             self.render_day(
-                x + self.cell_size.width * (week_day + 1) - self.cell_size.width * 0.15,
-                y,
+                x + day_x[week_day],
+                y + week_y[week],
                 day,
                 month
             )
             if week_day == 6:
-                y += self.cell_size.height
+                week += 1
 
     def render_month(self, x: float, y: float, month: int) -> None:
         """
@@ -256,10 +1733,12 @@ class Calendar:
         """
         # print(f"Month start points: {x / mm, y / mm}")
         # print(self.cell_size.width / mm, month)
-        self.pdf.drawCentredString(
+        self.draw_string(
             x + self.month_width / 2,
             y,
-            calendar.month_name[month]
+            calendar.month_name[month],
+            black,
+            "centre"
         )
         y += self.cell_size.height
 
@@ -273,14 +1752,14 @@ class Calendar:
         :param y:
         :return:
         """
-        self.pdf.setFont(self.font, self.font_size + 2)
+        self.set_font(self.font, self.font_size + 2)
         self.pdf.drawCentredString(
             self.width / 2,
             y,
             f"Производственный календарь на {self.year} год"
         )
         y += self.cell_size.height * 2
-        self.pdf.setFont(self.font, self.font_size)
+        self.set_font(self.font, self.font_size)
 
         # there are 31 cell and 7 in every month in case 4 months
         # per line plus 3 empty cells as border
@@ -290,14 +1769,25 @@ class Calendar:
         for i in range(12):
             month = i + 1
 
-            self.render_month(
-                self.left_margin + (self.month_width + self.cell_size.width) * (i // 3),
-                y + self.month_height * (i % 3),
-                month
-            )
+            self.render_month(*self.month_position(month, y), month)
+        self.draw_text_batch()
 
         return y + self.month_height * 3
 
+    def month_position(
+            self,
+            month: int,
+            y: float
+    ) -> typing.Tuple[float, float]:
+        """
+        Returns location of the month in the year part starting at y.
+        :param month:
+        :param y:
+        :return:
+        """
+        x, month_y = self.layout.month_origins[month - 1]
+        return x, y + month_y
+
     def render_holidays(self, y: float) -> float:
         """
         Renders holidays part. A list of date and description for
@@ -307,82 +1797,91 @@ class Calendar:
         """
         # print("-----Holidays-----")
         self.font = "Calibri"
-        self.pdf.setFont(self.font, self.font_size - 3)
+        self.set_font(self.font, self.font_size - 3)
 
         for i, holiday in enumerate(self.holidays):
-            self.pdf.setFillColor(darkred)
             # print(i, holiday)
             # print(min(holiday.date), max(holiday.date), len(holiday.date))
-            pos_x = self.left_margin + self.cell_size.width * 10 * (i // 3)
-            pos_y = y + self.cell_size.height * (i % 3)
+            pos_x, pos_y = self.layout.holiday_origin(i)
+            pos_y += y
             # print(pos_x, pos_y)
             if len(holiday.date) > 1:
                 date = f"{min(holiday.date).day}-{max(holiday.date).day} "
                 date += min(holiday.date).strftime("%b")
 
-                self.pdf.drawCentredString(
+                self.draw_string(
                     pos_x + self.cell_size.width * 3 / 2,
                     pos_y,
-                    str(date)
+                    str(date),
+                    darkred,
+                    "centre"
                 )
-                self.pdf.setFillColor(black)
             else:
                 date = (
                     f"{holiday.date[0].day}"
                     f" {convert_month_name(holiday.date[0].strftime('%b'))}")
-                self.pdf.drawCentredString(
+                self.draw_string(
                     pos_x + self.cell_size.width,
                     pos_y,
-                    date
+                    date,
+                    darkred,
+                    "centre"
                 )
-                self.pdf.setFillColor(black)
-                self.pdf.drawString(
+                self.draw_string(
                     pos_x + self.cell_size.width * 2,
                     pos_y,
-                    holiday.date[0].strftime("%a")
+                    holiday.date[0].strftime("%a"),
+                    black
                 )
 
-            self.pdf.drawString(
+            self.draw_string(
                 pos_x + self.cell_size.width * 3,
                 pos_y,
-                holiday.name
+                holiday.name,
+                black
             )
+        self.draw_text_batch()
 
         y += self.cell_size.height * 4
 
-        self.font = "CalibriB"
-        self.pdf.setFont(self.font, self.font_size)
+        self.draw_form("legend", 0, y, self.render_legend)
+        self.font = "Calibri"
+        y += self.cell_size.height * 2
+        return y
+
+    def render_legend(self) -> None:
+        """
+        Renders explanation of the colors used for days.
+        :return:
+        """
+        self.set_font("CalibriB", self.font_size)
 
         self.pdf.setFillColor(green)
         self.pdf.drawCentredString(
             self.left_margin + self.cell_size.width * 0.5,
-            y,
+            0,
             "22"
         )
 
         self.pdf.setFillColor(black)
-        self.font = "Calibri"
-        self.pdf.setFont(self.font, self.font_size - 3)
+        self.set_font("Calibri", self.font_size - 3)
 
         self.pdf.drawString(
             self.left_margin + self.cell_size.width,
-            y,
+            0,
             " - Предпраздничные дни, в которые продолжительность работы "
             "сокращается на один час"
         )
-        y += self.cell_size.height * 2
-        return y
 
-    def render_schedule(self, y: float) -> float:
+    def render_schedule_header(self) -> None:
         """
-        Renders production schedule part.
-        Calculations are performed inside.
-        :param y:
+        Renders title, column headers and vertical borders
+        of the production schedule table.
         :return:
         """
-        # print("-----Нормы времени-----")
-        self.font = "CalibriB"
-        self.pdf.setFont(self.font, self.font_size - 1)
+        x = self.left_margin
+        y = 0
+        self.set_font(self.font, self.font_size - 1)
 
         self.pdf.drawCentredString(
             self.width / 2,
@@ -394,8 +1893,6 @@ class Calendar:
 
         vertical_borders = [0, 3, 16, 12]
 
-        x = self.left_margin
-
         pos_x = x
 
         # draw vertical borders
@@ -465,7 +1962,21 @@ class Calendar:
 
         self.draw_horizontal_line(y)
 
-        y += self.cell_size.height
+    def render_schedule(self, y: float) -> float:
+        """
+        Renders production schedule part.
+        Calculations are performed inside.
+        :param y:
+        :return:
+        """
+        # print("-----Нормы времени-----")
+        self.font = "CalibriB"
+        self.set_font(self.font, self.font_size - 1)
+
+        self.draw_form("schedule_header", 0, y, self.render_schedule_header)
+
+        # the header takes three rows
+        y += self.cell_size.height * 3
 
         month = 0
         days: typing.List[int] = []
@@ -480,74 +1991,63 @@ class Calendar:
             datetime.date(2001, i + 1, 1).strftime("%B") for i in range(12)
         ]
 
+        # centers of the columns are in layout.schedule_x
         table_width = [
-            (3, months, black),
-            (4, days, black),
-            (4, work_days, black),
-            (7, holidays, red),
-            (1, short_days, green),
-            (4, work_hours, black),
-            (4, work_hours36, black),
-            (4, work_hours24, black),
+            (months, black),
+            (days, black),
+            (work_days, black),
+            (holidays, red),
+            (short_days, green),
+            (work_hours, black),
+            (work_hours36, black),
+            (work_hours24, black),
         ]
+        schedule_x = self.layout.schedule_x
+
+        working_time = WorkingTime.from_calendar(self)
 
         for i in range(12):
             month = i + 1
 
-            days.append(calendar.monthrange(self.year, month)[1])
-            work_days.append(
-                len([day for day in self.working_days
-                     if day.month == month]) +
-                len([day for day in self.shortened_work_day
-                     if day.month == month])
-            )
-            holidays.append(
-                len([day for day in self.weekends if day.month == month]) +
-                len([day for holiday in self.holidays for day in holiday.date
-                     if day.month == month])
-            )
-            short_days.append(
-                len([date for date in self.shortened_work_day
-                     if date.month == month])
-            )
-
-            work_hours.append(work_days[i] * 8 - short_days[i])
-            work_hours36.append(work_days[i] * 7.2 - short_days[i])
-            work_hours24.append(work_days[i] * 4.8 - short_days[i])
+            totals = working_time.month(self.year, month)
+            days.append(totals.days)
+            work_days.append(totals.work_days)
+            holidays.append(totals.holidays)
+            short_days.append(totals.short_days)
 
-            pos_x = x
+            work_hours.append(totals.hours[0])
+            work_hours36.append(totals.hours[1])
+            work_hours24.append(totals.hours[2])
 
             for j in range(len(table_width)):
-                pos_x += self.cell_size.width * table_width[j][0] / 2
                 self.print_cell(
-                    pos_x,
+                    schedule_x[j],
                     y,
-                    table_width[j][1],
+                    table_width[j][0],
                     i,
-                    table_width[j][2]
+                    table_width[j][1]
                 )
-                pos_x += self.cell_size.width * table_width[j][0] / 2
 
             if not month % 3:
                 self.draw_horizontal_line(y)
 
                 y += self.cell_size.height
 
-                pos_x = x
+                totals = working_time.quarter(self.year, month // 3)
                 quarter_table = [
                     f"{to_roman_numeral(i // 3 + 1)} Квартал",
-                    sum(days[i - 2:month]),
-                    sum(work_days[i - 2:month]),
-                    sum(holidays[i - 2:month]),
-                    sum(short_days[i - 2:month]),
-                    sum(work_hours[i - 2:month]),
-                    f"{sum(work_hours36[i - 2:month]):.1f}",
-                    f"{sum(work_hours24[i - 2:month]):.1f}",
+                    totals.days,
+                    totals.work_days,
+                    totals.holidays,
+                    totals.short_days,
+                    totals.hours[0],
+                    f"{totals.hours[1]:.1f}",
+                    f"{totals.hours[2]:.1f}",
                 ]
                 for j in range(len(table_width)):
-                    pos_x += self.cell_size.width * table_width[j][0] / 2
-                    self.print_cell(pos_x, y, [quarter_table[j]], 0, darkblue)
-                    pos_x += self.cell_size.width * table_width[j][0] / 2
+                    self.print_cell(
+                        schedule_x[j], y, [quarter_table[j]], 0, darkblue
+                    )
 
                 self.draw_horizontal_line(y)
 
@@ -555,171 +2055,392 @@ class Calendar:
 
                 y += self.cell_size.height
 
-                pos_x = x
-
+                totals = working_time.year(self.year)
                 annual_table = [
                     "Итого",
-                    sum(days[0:month]),
-                    sum(work_days[0:month]),
-                    sum(holidays[0:month]),
-                    sum(short_days[0:month]),
-                    sum(work_hours[0:month]),
-                    f"{sum(work_hours36[0:month]):.1f}",
-                    f"{sum(work_hours24[0:month]):.1f}",
+                    totals.days,
+                    totals.work_days,
+                    totals.holidays,
+                    totals.short_days,
+                    totals.hours[0],
+                    f"{totals.hours[1]:.1f}",
+                    f"{totals.hours[2]:.1f}",
                 ]
 
                 for j in range(len(table_width)):
-                    pos_x += self.cell_size.width * table_width[j][0] / 2
-                    self.print_cell(pos_x, y, [annual_table[j]], 0, darkblue)
-                    pos_x += self.cell_size.width * table_width[j][0] / 2
+                    self.print_cell(
+                        schedule_x[j], y, [annual_table[j]], 0, darkblue
+                    )
 
                 self.draw_horizontal_line(y)
 
             y += self.cell_size.height
 
+        self.draw_text_batch()
         return y
 
     def render_sign(self, y):
+        self.draw_form("sign", 0, y, self.render_sign_text)
+
+    def render_sign_text(self) -> None:
         string = "made by Ilya Rogovoy"
+        self.set_font(self.font, self.font_size - 1)
         self.pdf.setFillColor(HexColor(0xF0F0F0))
-        self.pdf.drawString(self.left_margin, y, string)
+        self.pdf.drawString(self.left_margin, 0, string)
         self.pdf.setFillColor(black)
 
 
-    def render(self) -> None:
+    def render(
+            self,
+            output: typing.Union[str, typing.BinaryIO, None] = None
+    ) -> None:
         """
         Prepares fonts, styles etc. required for rendering final image.
         Calls other necessary functions.
+        Saves the PDF to output, which is either a file name or
+        a writable binary object, self.output by default.
+        A shared canvas only gets a new page.
+        :param output:
+        :return:
+        """
+        import_reportlab()
+        if not self.shares_pdf:
+            if output is None:
+                output = self.output
+            self.pdf = canvas.Canvas(
+                output,
+                pagesize=self.page_size,
+                bottomup=False
+            )
+
+        if self.instrumentation is not None:
+            self.instrumentation.instrument(self.pdf)
+
+        self.render_page()
+
+        if not self.shares_pdf:
+            position = None
+            if not isinstance(output, str):
+                with contextlib.suppress(AttributeError, OSError):
+                    position = output.tell()
+            with self.measure("save"):
+                self.pdf.save()
+            if self.instrumentation is not None:
+                if isinstance(output, str):
+                    self.instrumentation.output_size = (
+                        os.path.getsize(output)
+                    )
+                elif position is not None:
+                    self.instrumentation.output_size = (
+                        output.tell() - position
+                    )
+                self.instrumentation.report()
+
+    def render_page(self) -> None:
+        """
+        Renders the year as the current page of the canvas.
         :return:
         """
         locale.setlocale(locale.LC_ALL, self.locale)
 
         # print(f"Page size: {self.width / mm, self.height / mm}")
-        fonts = (
-            "DejaVuSans",
-            "Calibri",
-            "CalibriB",
-            "CalibriI",
-            "CalibriL",
-            "CalibriLI",
-            "CalibriZ"
-        )
-        for font in fonts:
-            pdfmetrics.registerFont(TTFont(font, font + ".ttf"))
-
-        self.pdf.setFont(self.font, self.font_size)
+        self.set_font(self.font, self.font_size)
 
         y = self.top_margin
 
-        y = self.render_year(y)
+        with self.measure("render_year"):
+            y = self.render_year(y)
 
-        y = self.render_holidays(y)
+        with self.measure("render_holidays"):
+            y = self.render_holidays(y)
 
-        y = self.render_schedule(y)
+        with self.measure("render_schedule"):
+            y = self.render_schedule(y)
 
-        y = self.render_sign(y)
+        with self.measure("render_sign"):
+            y = self.render_sign(y)
 
         self.pdf.showPage()
-        try:
-            self.pdf.save()
-        except PermissionError as exception:
-            print("------EГГOГ------")
-            print(exception)
-            print(f"Check if the file is not opened and you have \n"
-                  f"enough permissions writing to this folder.")
-
-
-    def setup(self) -> None:
-        """
-        Initializes all the holidays and other special days
-        according to lists (or input).
-        If it is a transferable holiday and concurs with a weekend,
-        it marks next day as weekend.
-        :return:
-        """
-        # A workaround. Here we try to convert
-        # holidays format to a datetime object.
-        for date in self.holidays:
-            date[0] = datetime.datetime.strptime(
-                str(self.year)+date[0],
-                "%Y%m-%d"
-            ).date()
-
-        # convert weekend transfer to datetime
-        for date in self.weekend_transfer:
-            date[0], date[1] = (
-                datetime.datetime.strptime(date[0], "%Y-%m-%d").date(),
-                datetime.datetime.strptime(date[1], "%Y-%m-%d").date()
-            )
 
-        # convert holidays data to Holiday object
-        for i, date in enumerate(self.holidays):
-            self.holidays[i] = Holiday(
-                date=[date[0]],
-                is_transferable=bool(date[1]),
-                name=date[2]
-            )
+    def render_bytes(self) -> bytes:
+        """
+        Renders the PDF in memory and returns its content.
+        :return:
+        """
+        buffer = io.BytesIO()
+        self.render(buffer)
+        return buffer.getvalue()
 
-        for i, base_holiday in enumerate(self.holidays):
-            for j, probe_holiday in reversed(list(enumerate(self.holidays))):
-                # print(i, j)
+    def setup(self, render: bool = True) -> None:
+        """
+        Sets the calendar up by the shared rule engine and renders it
+        unless render is False. The year is classified by the rules file
+        only, holidays and weekend transfers set on the instance before
+        are replaced; change a set up calendar by add_holiday() and
+        add_weekend_transfer(). Setting up alone neither imports
+        reportlab nor creates a canvas.
+        :param render:
+        :return:
+        """
+        with self.measure("setup"):
+            self.resolve()
+
+        if render:
+            self.render()
+
+
+def classify_years(
+        first_year: int,
+        last_year: int,
+        country: str = "RU"
+) -> YearSpan:
+    """
+    Classifies every day from the 1st of January of first_year
+    to the 31st of December of last_year at once using array operations.
+    Applies the same rules as Calendar.setup: weekend transfers,
+    moving transferable holidays off weekends and shortened work days
+    before transferable holidays.
+    :param first_year:
+    :param last_year:
+    :param country:
+    :return:
+    """
+    import numpy as np
+
+    rules = load_rules()
+    start = np.datetime64(f"{first_year:04d}-01-01", "D")
+    end = np.datetime64(f"{last_year + 1:04d}-01-01", "D")
+    dates = np.arange(start, end, dtype="datetime64[D]")
+    size = len(dates)
+    # 1970-01-01 is Thursday
+    weekday = ((dates.astype(np.int64) + 3) % 7).astype(np.int8)
+    years = dates.astype("datetime64[Y]").astype(np.int64)
+
+    weekends = weekday >= 5
+    first_ordinal = datetime.date(first_year, 1, 1).toordinal()
+    for year in range(first_year, last_year + 1):
+        for weekend, transfer in rules.weekend_transfer(country, year):
+            for ordinal, value in ((weekend, False), (transfer, True)):
+                if 0 <= ordinal - first_ordinal < size:
+                    weekends[ordinal - first_ordinal] = value
+
+    year_starts = np.arange(
+        first_year - 1970, last_year + 1 - 1970
+    ).astype("datetime64[Y]").astype("datetime64[M]")
+    is_holiday = np.zeros(size, dtype=bool)
+    holiday_id = np.full(size, -1, dtype=np.int16)
+    holiday_names: typing.List[str] = []
+    transferable: typing.List[np.ndarray] = []
+    for (month, day), is_transferable, name in rules.holidays(country):
+        offsets = (
+            (year_starts + (month - 1)).astype("datetime64[D]")
+            + (day - 1) - start
+        ).astype(np.int64)
+        if name not in holiday_names:
+            holiday_names.append(name)
+        is_holiday[offsets] = True
+        holiday_id[offsets] = holiday_names.index(name)
+        if is_transferable:
+            transferable.append(offsets)
+
+    transferable_offsets = np.concatenate(
+        transferable or [np.zeros(0, dtype=np.int64)]
+    )
+    # a transferable holiday on a weekend moves the weekend
+    # to the next day which is not Saturday or Sunday,
+    # that day may be a transferable holiday moved further
+    moved = np.zeros(0, dtype=np.int64)
+    while True:
+        collapsed = transferable_offsets[weekends[transferable_offsets]]
+        if len(collapsed) == len(moved):
+            break
+        moved = collapsed
+        targets = collapsed + np.array(
+            [1, 1, 1, 1, 3, 2, 1]
+        )[weekday[collapsed]]
+        in_span = targets < size
+        targets, collapsed = targets[in_span], collapsed[in_span]
+        weekends[targets[years[targets] == years[collapsed]]] = True
+    weekends &= ~is_holiday
+
+    # the day before a transferable holiday is shortened
+    # unless it is a day off
+    previous = transferable_offsets - 1
+    previous = previous[
+        (previous >= 0)
+        & (years[np.maximum(previous, 0)] == years[transferable_offsets])
+    ]
+    shortened = np.zeros(size, dtype=bool)
+    shortened[previous[~weekends[previous]]] = True
+
+    day_type = np.full(size, WORKING_DAY, dtype=np.int8)
+    day_type[shortened] = SHORTENED_DAY
+    day_type[weekends] = WEEKEND
+    day_type[is_holiday] = HOLIDAY
+
+    hours = np.zeros((size, len(WEEK_NORMS)))
+    norms = np.array(WEEK_NORMS) / 5
+    hours[day_type == WORKING_DAY] = norms
+    hours[day_type == SHORTENED_DAY] = norms - 1
+
+    return YearSpan(dates, weekday, day_type, hours,
+                    holiday_id, holiday_names)
+
+
+def compile_rules(path: str, mtime: int, size: int) -> bytes:
+    """
+    Compiles a JSON rules file to the binary form read by HolidayRules.
+    mtime and size of the source are stored to detect its changes.
+    """
+    with open(path, encoding="utf-8") as file:
+        source = json.load(file)
+
+    def resolve(
+            code: str,
+            children: typing.Tuple[str, ...] = ()
+    ) -> typing.Tuple[typing.List[list], typing.Dict[int, list]]:
+        # a region inherits holidays and transfers of its parent
+        # and adds its own
+        if code in children:
+            raise ValueError(f"Rules of {code} inherit themselves")
+        rules = source["countries"][code]
+        holidays: typing.List[list] = []
+        transfers: typing.Dict[int, list] = {}
+        if "parent" in rules:
+            holidays, transfers = resolve(rules["parent"], children + (code,))
+        holidays = holidays + [
+            [tuple(int(part) for part in month_day.split("-")),
+             int(is_transferable), name]
+            for month_day, is_transferable, name in rules["holidays"]
+        ]
+        transfers = dict(transfers)
+        for year, year_transfers in rules.get("transfers", {}).items():
+            transfers[int(year)] = transfers.get(int(year), []) + [
+                [datetime.datetime.strptime(date, "%Y-%m-%d").toordinal()
+                 for date in transfer]
+                for transfer in year_transfers
+            ]
+        return holidays, transfers
+
+    countries = []
+    for code in source["countries"]:
+        holidays, transfers = resolve(code)
+        first_year = min(transfers, default=0)
+        year_count = max(transfers, default=-1) - first_year + 1
+        countries.append((code, marshal.dumps(holidays), first_year, [
+            marshal.dumps(transfers[year]) if year in transfers else b""
+            for year in range(first_year, first_year + year_count)
+        ]))
+
+    tables = RULES_HEADER.size + RULES_COUNTRY.size * len(countries)
+    blobs = tables + sum(
+        RULES_YEAR.size * len(years) for *_, years in countries
+    )
+    header = [RULES_HEADER.pack(
+        RULES_MAGIC, source["version"], mtime, size, len(countries)
+    )]
+    year_tables: typing.List[bytes] = []
+    data: typing.List[bytes] = []
+    for code, holidays, first_year, years in countries:
+        header.append(RULES_COUNTRY.pack(
+            code.encode(), blobs, len(holidays), first_year, len(years),
+            tables + RULES_YEAR.size * len(year_tables)
+        ))
+        data.append(holidays)
+        blobs += len(holidays)
+        for year in years:
+            year_tables.append(RULES_YEAR.pack(blobs, len(year)))
+            data.append(year)
+            blobs += len(year)
+    return b"".join(header + year_tables + data)
+
+
+@functools.lru_cache(maxsize=None)
+def page_layout(
+        page_size: typing.Tuple[float, float],
+        font_size: int
+) -> Layout:
+    """
+    Returns geometry of the page computed once per process
+    for every page size and font size.
+    """
+    return Layout(page_size, font_size)
+
+
+@functools.lru_cache(maxsize=None)
+def code_version() -> str:
+    """
+    Returns the hash of this module source, which changes with
+    any change of rendering.
+    """
+    with open(os.path.abspath(__file__), "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def load_rules(path: str = RULES_FILE) -> HolidayRules:
+    """
+    Returns holiday rules of the file loaded once per process.
+    """
+    return HolidayRules(path)
+
+
+def import_reportlab() -> None:
+    """
+    Imports reportlab on the first rendering. Computing years does not
+    need it, so the module is loaded without paying for its import.
+    """
+    global Color, HexColor, black, darkblue, darkred, green, lightgrey, red
+    global pdfmetrics, TTFError, TTFont, canvas
+    if DAY_COLORS:
+        return
+    from reportlab.lib.colors import (Color, HexColor, black, darkblue,
+                                      darkred, green, lightgrey, red)
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFError, TTFont
+    from reportlab.pdfgen import canvas
+
+    with registered_fonts_lock:
+        registered_fonts.update(pdfmetrics.standardFonts)
+    DAY_COLORS.update({
+        WORKING_DAY: black,
+        SHORTENED_DAY: green,
+        WEEKEND: red,
+        HOLIDAY: HexColor(0x990000),
+    })
+
+
+def register_font(font: str) -> None:
+    """
+    Registers a TrueType font with reportlab unless it has already
+    been registered by this process. The file is taken from FONT_FILES
+    or named after the font. Raises FileNotFoundError if the file
+    cannot be loaded.
+    """
+    import_reportlab()
+    if font in registered_fonts:
+        return
+    with registered_fonts_lock:
+        if font in registered_fonts:
+            return
+        file_name = FONT_FILES.get(font, font + ".ttf")
+        try:
+            pdfmetrics.registerFont(TTFont(font, file_name))
+        except TTFError as exception:
+            raise FileNotFoundError(
+                f"Font {font} cannot be loaded from {file_name}: {exception}"
+            ) from exception
+        registered_fonts.add(font)
 
-                if j > i and base_holiday.name == probe_holiday.name:
-                    self.holidays[i].date.append(*probe_holiday.date)
-                    del self.holidays[j]
 
-        # iterate over all days in a year
-        start_date = datetime.date(self.year, 1, 1)
-        end_date = datetime.date(self.year + 1, 1, 1)
-
-        for date in [
-            start_date + datetime.timedelta(days=x)
-            for x in range((end_date - start_date).days)
-        ]:
-            # populate weekends
-            if date.weekday() in (5, 6):
-                self.weekends.add(date)
-
-        # exchange holidays according to weekend transfer list
-        for date in self.weekend_transfer:
-            self.weekends.discard(date[0])
-            self.weekends.add(date[1])
-
-        for date in [
-            start_date + datetime.timedelta(days=x)
-            for x in range((end_date - start_date).days)
-        ]:
-            # Populate weekend transfers and shortened work days
-            # warning!: shortened days are calculated
-            # only for transferable holidays.
-            # print(date, date.weekday())
-            if date in [
-                date for holiday in self.holidays for date in holiday.date
-                if holiday.is_transferable
-            ]:
-                if date in self.weekends:
-                    print(f"A transferable date {date} "
-                          f"has collapsed with weekend, "
-                          f"trying to move to the next working day")
-                    transfer_day = date + datetime.timedelta(days=1)
-                    # We cannot increment holiday transfer day b
-                    # y checking it in weekend list as this list
-                    # is populating in the same loop.
-                    while transfer_day.weekday() in (5, 6):
-                        transfer_day += datetime.timedelta(days=1)
-                    self.weekends.add(transfer_day)
-                    self.weekends.discard(date)
-                    print(f"A suitable date has been found: {transfer_day}")
-                prev_date = date - datetime.timedelta(days=1)
-                if prev_date not in self.weekends:
-                    print(f"Found a shortened work day: {prev_date}")
-                    self.shortened_work_day.add(prev_date)
-            elif date in [
-                date for holiday in self.holidays for date in holiday.date
-            ]:
-                self.weekends.discard(date)
-
-        self.render()
+def day_hours(norm: int) -> typing.Union[int, float]:
+    """
+    Returns length of a working day in hours for a week norm
+    of five working days. Stays integer when possible.
+    """
+    if norm % 5:
+        return norm / 5
+    return norm // 5
 
 
 def to_roman_numeral(number: int) -> str:
@@ -741,21 +2462,591 @@ def convert_month_name(month: str) -> str:
     return month
 
 
+def render_calendar(
+        year: int,
+        page_size: str = "A4",
+        font: str = "CalibriB",
+        font_size: int = 12,
+        locale: str = "Russian_Russia"
+) -> bytes:
+    """
+    Sets up a calendar for the year and returns the rendered PDF.
+    page_size is one of PAGE_SIZES names.
+    """
+    buffer = io.BytesIO()
+    cal = Calendar(
+        year,
+        page_size=PAGE_SIZES[page_size],
+        font=font,
+        font_size=font_size,
+        locale=locale,
+        output=buffer
+    )
+    cal.setup()
+    return buffer.getvalue()
+
+
+def classification_json(year: int) -> bytes:
+    """
+    Returns day classification and monthly working time
+    of the year encoded as JSON.
+    """
+    span = classify_years(year, year)
+    working_time = WorkingTime(datetime.date(year, 1, 1),
+                               span.day_type.tolist())
+    days = [
+        {
+            "date": str(date),
+            "type": DAY_TYPE_NAMES[day_type],
+            "holiday": (span.holiday_names[holiday_id]
+                        if holiday_id >= 0 else None),
+            "hours": hours,
+        }
+        for date, day_type, holiday_id, hours in zip(
+            span.dates.tolist(),
+            span.day_type.tolist(),
+            span.holiday_id.tolist(),
+            span.hours.tolist()
+        )
+    ]
+    months = []
+    for month in range(1, 13):
+        totals = working_time.month(year, month)
+        months.append({
+            "month": month,
+            "days": totals.days,
+            "work_days": totals.work_days,
+            "holidays": totals.holidays,
+            "short_days": totals.short_days,
+            "hours": {
+                str(norm): round(hours, 1)
+                for norm, hours in zip(WEEK_NORMS, totals.hours)
+            },
+        })
+    return json.dumps(
+        {"year": year, "days": days, "months": months},
+        ensure_ascii=False
+    ).encode()
+
+
+def render_years(
+        years: typing.Iterable[int],
+        output: typing.Union[str, typing.BinaryIO],
+        page_size: typing.Tuple[float, float] = A4,
+        font: str = 'CalibriB',
+        font_size: int = 12,
+        locale: str = 'Russian_Russia'
+) -> None:
+    """
+    Renders a single PDF with a page for every year. All the pages share
+    one canvas, so fonts and static forms are embedded only once.
+    """
+    import_reportlab()
+    pdf = canvas.Canvas(output, pagesize=page_size, bottomup=False)
+    for year in years:
+        cal = Calendar(
+            year,
+            page_size=page_size,
+            font=font,
+            font_size=font_size,
+            locale=locale,
+            pdf=pdf
+        )
+        cal.setup()
+    pdf.save()
+
+
+def iter_days(
+        years: typing.Iterable[int],
+        country: str = "RU"
+) -> typing.Iterator[dict]:
+    """
+    Yields classification of every day of the years one year at a time.
+    A day is transferred if it is a working Saturday or Sunday or a day
+    off on a weekday which is not a holiday.
+    """
+    for year in years:
+        span = classify_years(year, year, country)
+        for date, weekday, day_type, holiday_id, hours in zip(
+                span.dates.tolist(),
+                span.weekday.tolist(),
+                span.day_type.tolist(),
+                span.holiday_id.tolist(),
+                span.hours.tolist()
+        ):
+            row = {
+                "date": date.isoformat(),
+                "type": DAY_TYPE_NAMES[day_type],
+                "holiday": (span.holiday_names[holiday_id]
+                            if holiday_id >= 0 else ""),
+                "transferred": (
+                    (day_type <= SHORTENED_DAY and weekday >= 5)
+                    or (day_type == WEEKEND and weekday < 5)
+                ),
+            }
+            for norm, norm_hours in zip(WEEK_NORMS, hours):
+                row[f"hours_{norm}"] = round(norm_hours, 1)
+            yield row
+
+
+def ics_line(line: str) -> str:
+    """
+    Folds an iCalendar content line to 75 octets.
+    """
+    result = []
+    data = line.encode()
+    while len(data) > 75:
+        cut = 75 if not result else 74
+        # do not split a UTF-8 sequence
+        while data[cut] & 0xC0 == 0x80:
+            cut -= 1
+        result.append(data[:cut].decode())
+        data = data[cut:]
+    result.append(data.decode())
+    return "\r\n ".join(result) + "\r\n"
+
+
+def ics_text(text: str) -> str:
+    """
+    Escapes a TEXT property value of iCalendar: backslash, comma,
+    semicolon and line breaks.
+    """
+    return (text.replace("\\", "\\\\").replace(",", "\\,")
+            .replace(";", "\\;").replace("\n", "\\n"))
+
+
+def export_days(
+        stream: typing.TextIO,
+        export_format: str,
+        years: typing.Iterable[int],
+        country: str = "RU"
+) -> None:
+    """
+    Writes classification of the days of the years to a text stream
+    as it is computed. export_format is "csv", "jsonl" or "ics";
+    an iCalendar feed only holds holidays and shortened work days.
+    """
+    rows = iter_days(years, country)
+    if export_format == "jsonl":
+        for row in rows:
+            stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+    elif export_format == "csv":
+        fields = ["date", "type", "holiday", "transferred"]
+        fields.extend(f"hours_{norm}" for norm in WEEK_NORMS)
+        writer = csv.DictWriter(stream, fields, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    elif export_format == "ics":
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime(
+            "%Y%m%dT%H%M%SZ"
+        )
+        stream.write(ics_line("BEGIN:VCALENDAR"))
+        stream.write(ics_line("VERSION:2.0"))
+        stream.write(ics_line(
+            "PRODID:-//working_time_calendar//Calendar.py//RU"
+        ))
+        for row in rows:
+            if row["type"] == "holiday":
+                summary = row["holiday"]
+            elif row["type"] == "shortened":
+                summary = "Предпраздничный день, короче на один час"
+            else:
+                continue
+            date = datetime.date.fromisoformat(row["date"])
+            next_date = date + datetime.timedelta(days=1)
+            for line in (
+                    "BEGIN:VEVENT",
+                    f"UID:{row['type']}-{date:%Y%m%d}-{country}"
+                    f"@working_time_calendar",
+                    f"DTSTAMP:{stamp}",
+                    f"DTSTART;VALUE=DATE:{date:%Y%m%d}",
+                    f"DTEND;VALUE=DATE:{next_date:%Y%m%d}",
+                    f"SUMMARY:{ics_text(summary)}",
+                    "TRANSP:TRANSPARENT",
+                    "END:VEVENT",
+            ):
+                stream.write(ics_line(line))
+        stream.write(ics_line("END:VCALENDAR"))
+    else:
+        raise ValueError(f"Unknown export format {export_format}")
+
+
+class DayClassifier:
+    """
+    Classifies dates of any years. A table of the fields of every day
+    of a year is built the first time a date of the year is seen:
+    day type name, holiday name and hours for every WEEK_NORMS entry.
+    """
+    FIELDS = ["type", "holiday"] + [f"hours_{norm}" for norm in WEEK_NORMS]
+
+    def __init__(self, country: str = "RU"):
+        self.country = country
+        # year -> ordinal of its first day, fields of every day
+        self.years: typing.Dict[
+            int, typing.Tuple[int, typing.List[typing.List[str]]]
+        ] = {}
+
+    def load(
+            self,
+            year: int
+    ) -> typing.Tuple[int, typing.List[typing.List[str]]]:
+        compact = rule_engine.resolve(self.country, year)
+        hours = {
+            WORKING_DAY: [f"{day_hours(norm):.1f}" for norm in WEEK_NORMS],
+            SHORTENED_DAY: [
+                f"{day_hours(norm) - 1:.1f}" for norm in WEEK_NORMS
+            ],
+        }
+        no_hours = ["0.0"] * len(WEEK_NORMS)
+        days = []
+        for day in compact.days:
+            day_type = day & CompactYear.TYPE_MASK
+            holiday_id = day >> CompactYear.HOLIDAY_SHIFT
+            days.append(
+                [DAY_TYPE_NAMES[day_type],
+                 compact.holidays[holiday_id - 1][0] if holiday_id else ""]
+                + hours.get(day_type, no_hours)
+            )
+        table = datetime.date(year, 1, 1).toordinal(), days
+        self.years[year] = table
+        return table
+
+    def fields(self, value: str) -> typing.List[str]:
+        """
+        Returns fields of a date given as an ISO 8601 date or timestamp,
+        empty ones if it is not a date.
+        """
+        try:
+            day = datetime.date.fromisoformat(value.strip()[:10])
+        except ValueError:
+            return [""] * len(self.FIELDS)
+        first_ordinal, days = (
+            self.years.get(day.year) or self.load(day.year)
+        )
+        return days[day.toordinal() - first_ordinal]
+
+
+def classify_dates(
+        stream: typing.TextIO,
+        output: typing.TextIO,
+        column: typing.Optional[str] = None,
+        delimiter: str = ",",
+        country: str = "RU",
+        batch_size: int = 10000
+) -> None:
+    """
+    Reads dates from the stream, one per line or in a column of CSV rows,
+    and writes them as CSV with day type, holiday name and hours
+    for every WEEK_NORMS entry. column is a number from 1 or a name
+    in the header row. The fields are inserted after a numbered column
+    and appended to rows under a header, which may not be longer than
+    the header. Lines are processed in batches of batch_size.
+    """
+    classifier = DayClassifier(country)
+    fields = classifier.fields
+    writer = csv.writer(output, delimiter=delimiter, lineterminator="\n")
+    if column is None:
+        writer.writerow(["date"] + DayClassifier.FIELDS)
+        rows: typing.Iterator = (
+            line.strip() for line in stream if not line.isspace()
+        )
+        for batch in iter(lambda: list(itertools.islice(rows, batch_size)),
+                          []):
+            writer.writerows([[date] + fields(date) for date in batch])
+        return
+
+    rows = csv.reader(stream, delimiter=delimiter)
+    header: typing.Optional[typing.List[str]] = None
+    if column.isdigit():
+        index = int(column) - 1
+        if index < 0:
+            raise ValueError("Columns are numbered from 1")
+    else:
+        header = next(rows, [])
+        if column not in header:
+            raise ValueError(f"There is no column {column}")
+        index = header.index(column)
+        writer.writerow(header + DayClassifier.FIELDS)
+    empty = [""] * len(DayClassifier.FIELDS)
+
+    def classified(row: typing.List[str]) -> typing.List[str]:
+        date_fields = fields(row[index]) if index < len(row) else empty
+        if header is None:
+            # without a header the fields follow the date column
+            row = row + [""] * (index + 1 - len(row))
+            return row[:index + 1] + date_fields + row[index + 1:]
+        # the fields follow the header, short rows are padded
+        if len(row) > len(header):
+            raise ValueError(
+                f"A row has more fields than the header: "
+                f"{delimiter.join(row)}"
+            )
+        return row + [""] * (len(header) - len(row)) + date_fields
+
+    for batch in iter(lambda: list(itertools.islice(rows, batch_size)), []):
+        writer.writerows([classified(row) for row in batch])
+
+def parse_years(years: str) -> typing.List[int]:
+    """
+    Converts a comma separated list of years and year ranges
+    such as "2020-2035,2040" to a list of years.
+    Raises ValueError if the string is malformed.
+    """
+    result: typing.List[int] = []
+    for part in years.split(","):
+        first, _, last = part.strip().partition("-")
+        if not first.isdigit() or not (last or first).isdigit():
+            raise ValueError(f"Malformed year or range of years: {part}")
+        first_year, last_year = int(first), int(last or first)
+        if first_year > last_year:
+            raise ValueError(f"Range of years is reversed: {part}")
+        result.extend(range(first_year, last_year + 1))
+    return result
+
+
+def generate_year(
+        year: int,
+        cache: typing.Optional[OutputCache] = None
+) -> typing.Tuple[str, bool]:
+    """
+    Sets up and renders a calendar for the year unless the cache
+    holds it already. Returns name of the created file and whether
+    it has been taken from the cache.
+    """
+    cal = Calendar(year, page_size=A4, font_size=12)
+    if cache is not None:
+        key = cache.key(cal)
+        if cache.get(key, cal.output):
+            return cal.output, True
+    cal.setup()
+    if cache is not None:
+        cache.put(key, cal.output)
+    return cal.output, False
+
+
+def generate_years(
+        years: typing.Sequence[int],
+        jobs: int = 1,
+        cache: typing.Optional[OutputCache] = None
+) -> int:
+    """
+    Generates calendars for the years in a pool of jobs worker processes
+    reporting the result for every year. A failed year does not stop
+    the others. Returns number of failed years.
+    """
+    failed = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(generate_year, year, cache): year for year in years
+        }
+        for future in concurrent.futures.as_completed(futures):
+            year = futures[future]
+            try:
+                output, cached = future.result()
+                if cached:
+                    print(f"{year}: {output} is up to date")
+                else:
+                    print(f"{year}: {output} created")
+            except PermissionError as exception:
+                failed += 1
+                print(f"{year}: ------EГГOГ------")
+                print(exception)
+                print(f"Check if the file is not opened and you have \n"
+                      f"enough permissions writing to this folder.")
+            except Exception as exception:
+                failed += 1
+                print(f"{year}: failed: {exception!r}")
+    return failed
+
+
+@contextlib.contextmanager
+def piped_output() -> typing.Iterator[None]:
+    """
+    Exits quietly when the reader of standard output, such as head,
+    closes it before everything is written.
+    """
+    try:
+        yield
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # standard output is flushed once more at exit
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        raise SystemExit(1)
+
+
 def main() -> None:
-    args = sys.argv[1:]
-    if not args:
+    parser = argparse.ArgumentParser(
+        description=USAGE,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "years", nargs="?",
+        help="year, range of years or comma separated list of them"
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1,
+        help="number of worker processes rendering the years"
+    )
+    parser.add_argument(
+        "--single-file", metavar="FILE",
+        help="render all the years as pages of a single PDF file"
+    )
+    parser.add_argument(
+        "--export", choices=("csv", "jsonl", "ics"),
+        help="write day classification of the years instead of PDF"
+    )
+    parser.add_argument(
+        "--output", metavar="FILE",
+        help="file the export is written to, standard output by default"
+    )
+    parser.add_argument(
+        "--classify", action="store_true",
+        help="classify dates read from standard input instead of "
+             "creating calendars"
+    )
+    parser.add_argument(
+        "--column",
+        help="CSV column holding dates to classify, "
+             "a number from 1 or a name in the header"
+    )
+    parser.add_argument(
+        "--delimiter", default=",",
+        help="delimiter of CSV fields to classify"
+    )
+    parser.add_argument(
+        "--preview", action="store_true",
+        help="create PNG previews of the pages and months instead of PDF"
+    )
+    parser.add_argument(
+        "--dpi", type=float, default=100,
+        help="resolution of page previews"
+    )
+    parser.add_argument(
+        "--thumbnail-dpi", type=float, default=50,
+        help="resolution of month thumbnails"
+    )
+    parser.add_argument(
+        "--output-cache", metavar="DIR", default=OUTPUT_CACHE_DIR,
+        help="folder rendered calendars are reused from"
+    )
+    parser.add_argument(
+        "--output-cache-limit", metavar="MB", type=int, default=256,
+        help="size the output cache is trimmed to"
+    )
+    parser.add_argument(
+        "--no-output-cache", action="store_true",
+        help="render every calendar even if it has not changed"
+    )
+    parser.add_argument(
+        "--watch", metavar="JOB_DIR",
+        help="keep running, generate years named by files put into "
+             "JOB_DIR and regenerate years affected by changed rules"
+    )
+    parser.add_argument(
+        "--interval", type=float, default=1.0,
+        help="seconds between checks of the rules and the job folder"
+    )
+    parser.add_argument(
+        "--serve", metavar="[HOST:]PORT",
+        help="run HTTP service of calendars instead of creating files"
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=128,
+        help="number of documents the HTTP service keeps in memory"
+    )
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs should be a positive number")
+
+    if args.serve:
+        host, _, port = args.serve.rpartition(":")
+        if not port.isdigit():
+            parser.error("--serve expects [HOST:]PORT")
+        import asyncio
+
+        from service import CalendarService
+
+        service = CalendarService(args.jobs, args.cache_size)
+        try:
+            asyncio.run(service.serve(host or "127.0.0.1", int(port)))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    cache = None
+    if not args.no_output_cache:
+        cache = OutputCache(
+            args.output_cache, args.output_cache_limit * 1024 * 1024
+        )
+
+    if args.classify:
+        try:
+            if args.output is None:
+                with piped_output():
+                    classify_dates(sys.stdin, sys.stdout,
+                                   args.column, args.delimiter)
+            else:
+                with open(args.output, "w", encoding="utf-8",
+                          newline="") as file:
+                    classify_dates(sys.stdin, file,
+                                   args.column, args.delimiter)
+        except ValueError as exception:
+            parser.error(str(exception))
+        return
+
+    if args.watch:
+        try:
+            years = parse_years(args.years) if args.years else []
+        except ValueError as exception:
+            parser.error(str(exception))
+        from watcher import CalendarWatcher
+
+        watcher = CalendarWatcher(args.watch, args.interval, cache)
+        try:
+            watcher.run(years)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.years is None:
         year = datetime.date.today().year
         if datetime.date.today().month > 10:
             year += 1
-
-    elif args[0] == "--help":
-        raise SystemExit(USAGE)
-    elif args[0].isdigit():
-        year = int(args[0])
+        years = [year]
     else:
-        raise SystemExit(USAGE)
-    cal = Calendar(year, page_size=A4, font_size=12)
-    cal.setup()
+        try:
+            years = parse_years(args.years)
+        except ValueError as exception:
+            parser.error(str(exception))
+
+    if args.export:
+        if args.output is None:
+            with piped_output():
+                export_days(sys.stdout, args.export, years)
+        else:
+            with open(args.output, "w", encoding="utf-8",
+                      newline="") as file:
+                export_days(file, args.export, years)
+        return
+
+    if args.preview:
+        from raster import iter_previews
+
+        for name, data in iter_previews(
+                years, args.dpi, args.thumbnail_dpi, args.jobs):
+            with open(name, "wb") as file:
+                file.write(data)
+            print(f"{name} created")
+        return
+
+    if args.single_file:
+        render_years(years, args.single_file, page_size=A4, font_size=12)
+        print(f"{args.single_file} created")
+        return
+
+    if generate_years(years, args.jobs, cache):
+        raise SystemExit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,242 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import locale
+import platform
+import sys
+import time
+import tracemalloc
+import typing
+
+import numpy as np
+import reportlab
+from reportlab.pdfgen import canvas
+
+import Calendar
+
+
+USAGE = ("Benchmarks calendar setup, every rendering stage and batch\n"
+         "classification of years, saving results as JSON.\n"
+         "With --compare reports results slower than a stored baseline\n"
+         "and exits with status 1 if there are any.")
+
+RENDER_STAGES = (
+    "render_year", "render_holidays", "render_schedule", "render_sign", "save"
+)
+
+
+def measure(
+        function: typing.Callable[[], object],
+        repeat: int
+) -> typing.Dict[str, float]:
+    """
+    Runs the function repeat times after a warm-up run.
+    Returns the best and mean wall time in seconds and peak memory
+    allocated by a single run in bytes.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "best": min(times),
+        "mean": sum(times) / len(times),
+        "peak_memory": peak,
+    }
+
+
+def setup_only(cal: Calendar.Calendar) -> Calendar.Calendar:
+    """
+    Sets the calendar up without rendering it. The rule engine cache
+    is cleared first, so the year is resolved again on every run.
+    """
+    Calendar.rule_engine.clear()
+    cal.setup(render=False)
+    return cal
+
+
+def render_stages(
+        year: int,
+        page_size: str,
+        locale_name: str,
+        repeat: int
+) -> typing.Dict[str, typing.Dict[str, float]]:
+    """
+    Times every rendering stage of a set up calendar separately.
+    Every run renders a fresh page so stages see the same state.
+    """
+    timings: typing.Dict[str, typing.List[float]] = {
+        stage: [] for stage in RENDER_STAGES
+    }
+
+    def render() -> None:
+        cal = setup_only(Calendar.Calendar(
+            year,
+            page_size=Calendar.PAGE_SIZES[page_size],
+            locale=locale_name
+        ))
+        cal.pdf = canvas.Canvas(
+            io.BytesIO(), pagesize=cal.page_size, bottomup=False
+        )
+        locale.setlocale(locale.LC_ALL, cal.locale)
+        cal.set_font(cal.font, cal.font_size)
+        y = cal.top_margin
+        for stage in RENDER_STAGES:
+            start = time.perf_counter()
+            if stage == "save":
+                cal.pdf.showPage()
+                cal.pdf.save()
+            else:
+                y = getattr(cal, stage)(y)
+            timings[stage].append(time.perf_counter() - start)
+
+    peak = measure(render, repeat)["peak_memory"]
+    return {
+        stage: {
+            # the warm-up and memory runs are not counted
+            "best": min(times[1:repeat + 1]),
+            "mean": sum(times[1:repeat + 1]) / repeat,
+            "peak_memory": peak,
+        }
+        for stage, times in timings.items()
+    }
+
+
+def run(
+        year: int,
+        first_year: int,
+        last_year: int,
+        locale_name: str,
+        repeat: int
+) -> typing.Dict[str, typing.Dict[str, float]]:
+    results = {
+        "setup": measure(
+            lambda: setup_only(Calendar.Calendar(year, locale=locale_name)),
+            repeat
+        ),
+    }
+    for page_size in Calendar.PAGE_SIZES:
+        for stage, result in render_stages(
+                year, page_size, locale_name, repeat).items():
+            results[f"{stage}[{page_size}]"] = result
+        results[f"render[{page_size}]"] = measure(
+            lambda: Calendar.render_calendar(
+                year, page_size, locale=locale_name
+            ),
+            repeat
+        )
+
+    span = f"{first_year}-{last_year}"
+    results[f"setup_batch[{span}]"] = measure(
+        lambda: [
+            setup_only(Calendar.Calendar(year, locale=locale_name))
+            for year in range(first_year, last_year + 1)
+        ],
+        1
+    )
+    results[f"classify_years[{span}]"] = measure(
+        lambda: Calendar.classify_years(first_year, last_year), repeat
+    )
+    results[f"working_time[{span}]"] = measure(
+        lambda: Calendar.WorkingTime.for_years(first_year, last_year),
+        repeat
+    )
+
+    working_time = Calendar.WorkingTime.for_years(year, year)
+    rng = np.random.default_rng(0)
+    start = np.datetime64(f"{year:04d}-01-01") + rng.integers(0, 365, 10000)
+    end = start + rng.integers(0, 365, 10000)
+    weekly_hours = rng.choice(Calendar.WEEK_NORMS, 10000)
+    results[f"norms[{year}]"] = measure(
+        lambda: working_time.norms(year, weekly_hours, start, end), repeat
+    )
+    return results
+
+
+def compare(
+        results: typing.Dict[str, typing.Dict[str, float]],
+        baseline: typing.Dict[str, typing.Dict[str, float]],
+        threshold: float
+) -> int:
+    """
+    Prints every result next to its baseline and flags those slower
+    or using more memory than threshold allows.
+    Returns number of regressions.
+    """
+    regressions = 0
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:40} {result['best'] * 1000:10.3f} ms  (new)")
+            continue
+        ratio = result["best"] / baseline[name]["best"]
+        memory = result["peak_memory"] / max(baseline[name]["peak_memory"], 1)
+        flag = ""
+        if ratio > 1 + threshold or memory > 1 + threshold:
+            flag = "REGRESSION"
+            regressions += 1
+        print(f"{name:40} {result['best'] * 1000:10.3f} ms "
+              f"{ratio:6.2f}x time {memory:6.2f}x memory  {flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=USAGE,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--year", type=int, default=2023)
+    parser.add_argument("--first-year", type=int, default=1900)
+    parser.add_argument("--last-year", type=int, default=2100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--locale", default="Russian_Russia")
+    parser.add_argument(
+        "--output", default="benchmark_results.json",
+        help="file results are saved to"
+    )
+    parser.add_argument(
+        "--compare", metavar="BASELINE",
+        help="results file to compare with"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="allowed slowdown, 0.1 means 10%%"
+    )
+    args = parser.parse_args()
+
+    results = run(args.year, args.first_year, args.last_year,
+                  args.locale, args.repeat)
+    with open(args.output, "w") as file:
+        json.dump({
+            "meta": {
+                "date": datetime.datetime.now().isoformat(),
+                "python": sys.version,
+                "platform": platform.platform(),
+                "reportlab": reportlab.Version,
+                "numpy": np.__version__,
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        if compare(results, baseline, args.threshold):
+            raise SystemExit(1)
+    else:
+        for name, result in results.items():
+            print(f"{name:40} {result['best'] * 1000:10.3f} ms "
+                  f"{result['peak_memory'] / 1024:10.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
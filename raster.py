@@ -0,0 +1,305 @@
+import concurrent.futures
+import io
+import locale
+import typing
+
+from PIL import Image, ImageDraw, ImageFont
+from reportlab.lib.colors import Color, black
+from reportlab.pdfbase import pdfmetrics
+
+import Calendar
+
+
+class RasterText:
+    """
+    Text object of RasterCanvas holding strings at their positions.
+    """
+    def __init__(self, pdf: "RasterCanvas"):
+        self.pdf = pdf
+        self.font = pdf._fontname
+        self.size = pdf._fontsize
+        self.color = pdf.fill_color
+        self.x = self.y = 0.0
+        self.strings: typing.List[tuple] = []
+
+    def setFont(self, font: str, size: float) -> None:
+        self.font, self.size = font, size
+
+    def setFillColor(self, color: "Color") -> None:
+        self.color = color
+
+    def moveCursor(self, dx: float, dy: float) -> None:
+        self.x += dx
+        self.y += dy
+
+    def textOut(self, string: str) -> None:
+        self.strings.append(
+            (self.x, self.y, string, self.font, self.size, self.color)
+        )
+
+
+class RasterCanvas:
+    """
+    Draws the subset of the reportlab canvas interface Calendar uses onto
+    a Pillow image of the page, so previews are rasterized from the same
+    layout as the PDF. Coordinates are top-down points as on a canvas
+    created with bottomup=False. String widths are taken from reportlab
+    metrics, glyphs are drawn by Pillow from the same TrueType files.
+    box is x, y, width and height of the part of the page drawn,
+    the whole page by default.
+    """
+    def __init__(
+            self,
+            page_size: typing.Tuple[float, float],
+            dpi: float,
+            box: typing.Optional[typing.Tuple[float, ...]] = None
+    ):
+        Calendar.import_reportlab()
+        self.width, self.height = page_size
+        self.scale = dpi / 72
+        if box is None:
+            box = (0, 0, self.width, self.height)
+        self.origin = box[:2]
+        self.image = Image.new("RGB", (
+            round(box[2] * self.scale), round(box[3] * self.scale)
+        ), "white")
+        self.draw = ImageDraw.Draw(self.image)
+        self.fonts: typing.Dict[typing.Tuple[str, int], object] = {}
+        # user space -> page points as a, b, c, d, e, f of PDF matrices
+        self.matrix = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+        self._fontname = "Helvetica"
+        self._fontsize = 12.0
+        self.fill_color = black
+        self.states: typing.List[tuple] = []
+        self.forms: typing.Dict[str, typing.List[tuple]] = {}
+        # operations of the form being defined, in its own space
+        self.recording: typing.Optional[typing.List[tuple]] = None
+
+    def setFont(self, font: str, size: float) -> None:
+        self._fontname, self._fontsize = font, size
+
+    def setFontSize(self, size: float) -> None:
+        self._fontsize = size
+
+    def setFillColor(self, color: "Color") -> None:
+        self.fill_color = color
+
+    def stringWidth(self, string: str, font: str, size: float) -> float:
+        return pdfmetrics.stringWidth(string, font, size)
+
+    def saveState(self) -> None:
+        self.states.append(
+            (self.matrix, self._fontname, self._fontsize, self.fill_color)
+        )
+
+    def restoreState(self) -> None:
+        (self.matrix, self._fontname, self._fontsize,
+         self.fill_color) = self.states.pop()
+
+    def transform(
+            self,
+            a: float, b: float, c: float, d: float, e: float, f: float
+    ) -> None:
+        ma, mb, mc, md, me, mf = self.matrix
+        self.matrix = (
+            a * ma + b * mc, a * mb + b * md,
+            c * ma + d * mc, c * mb + d * md,
+            e * ma + f * mc + me, e * mb + f * md + mf
+        )
+
+    def translate(self, x: float, y: float) -> None:
+        self.transform(1, 0, 0, 1, x, y)
+
+    def point(self, x: float, y: float) -> typing.Tuple[float, float]:
+        a, b, c, d, e, f = self.matrix
+        return a * x + c * y + e, b * x + d * y + f
+
+    def pixel(self, x: float, y: float) -> typing.Tuple[float, float]:
+        return ((x - self.origin[0]) * self.scale,
+                (y - self.origin[1]) * self.scale)
+
+    def hasForm(self, name: str) -> bool:
+        return name in self.forms
+
+    def beginForm(self, name: str, *bounding_box: float) -> None:
+        self.saveState()
+        self.recording = self.forms[name] = []
+        # a form begins flipped as a canvas page does
+        self.matrix = (1.0, 0.0, 0.0, -1.0, 0.0, self.height)
+
+    def endForm(self) -> None:
+        self.recording = None
+        self.restoreState()
+
+    def doForm(self, name: str) -> None:
+        for operation, *arguments in self.forms[name]:
+            if operation == "line":
+                self.line(*arguments)
+            else:
+                self.text(*arguments)
+
+    def line(self, x1: float, y1: float, x2: float, y2: float) -> None:
+        (x1, y1), (x2, y2) = self.point(x1, y1), self.point(x2, y2)
+        if self.recording is not None:
+            self.recording.append(("line", x1, y1, x2, y2))
+            return
+        self.draw.line(
+            [self.pixel(x1, y1), self.pixel(x2, y2)],
+            fill="black",
+            width=max(1, round(self.scale))
+        )
+
+    def text(
+            self,
+            x: float,
+            y: float,
+            string: str,
+            font: str,
+            size: float,
+            color: "Color"
+    ) -> None:
+        x, y = self.point(x, y)
+        if self.recording is not None:
+            self.recording.append(("text", x, y, string, font, size, color))
+            return
+        key = (font, round(size * self.scale))
+        if key not in self.fonts:
+            self.fonts[key] = ImageFont.truetype(
+                Calendar.FONT_FILES.get(font, font + ".ttf"), key[1]
+            )
+        self.draw.text(
+            self.pixel(x, y),
+            string,
+            fill=tuple(round(part * 255) for part in color.rgb()),
+            font=self.fonts[key],
+            anchor="ls"
+        )
+
+    def drawString(self, x: float, y: float, string: str) -> None:
+        self.text(x, y, string, self._fontname, self._fontsize,
+                  self.fill_color)
+
+    def drawRightString(self, x: float, y: float, string: str) -> None:
+        width = self.stringWidth(string, self._fontname, self._fontsize)
+        self.drawString(x - width, y, string)
+
+    def drawCentredString(self, x: float, y: float, string: str) -> None:
+        width = self.stringWidth(string, self._fontname, self._fontsize)
+        self.drawString(x - width * 0.5, y, string)
+
+    def beginText(self) -> RasterText:
+        return RasterText(self)
+
+    def drawText(self, text: RasterText) -> None:
+        for arguments in text.strings:
+            self.text(*arguments)
+
+    def showPage(self) -> None:
+        pass
+
+    def save(self, output: typing.Union[str, typing.BinaryIO]) -> None:
+        self.image.save(output, format="PNG", optimize=True)
+
+    def png(self) -> bytes:
+        buffer = io.BytesIO()
+        self.save(buffer)
+        return buffer.getvalue()
+
+
+def render_preview(
+        year: int,
+        dpi: float = 100,
+        page_size: str = "A4",
+        font: str = "CalibriB",
+        font_size: int = 12,
+        locale: str = "Russian_Russia"
+) -> bytes:
+    """
+    Rasterizes the page of the year and returns it as PNG.
+    page_size is one of Calendar.PAGE_SIZES names.
+    """
+    pdf = RasterCanvas(Calendar.PAGE_SIZES[page_size], dpi)
+    cal = Calendar.Calendar(
+        year,
+        page_size=Calendar.PAGE_SIZES[page_size],
+        font=font,
+        font_size=font_size,
+        locale=locale,
+        pdf=pdf
+    )
+    cal.setup()
+    return pdf.png()
+
+
+def render_month(cal: Calendar.Calendar, month: int, dpi: float) -> bytes:
+    """
+    Rasterizes the month of a set up calendar as it is placed
+    on the page and returns it as PNG.
+    """
+    # months start two rows below the title as render_year places them
+    x, y = cal.month_position(
+        month, cal.top_margin + cal.cell_size.height * 2
+    )
+    # weekday names may be wider than their cells
+    cal.pdf = RasterCanvas(cal.page_size, dpi, (
+        x - cal.cell_size.width / 2,
+        y - cal.cell_size.height,
+        cal.month_width + cal.cell_size.width,
+        cal.month_height
+    ))
+    locale.setlocale(locale.LC_ALL, cal.locale)
+    cal.set_font(cal.font, cal.font_size)
+    cal.render_month(x, y, month)
+    cal.draw_text_batch()
+    return cal.pdf.png()
+
+
+def render_thumbnail(
+        year: int,
+        month: int,
+        dpi: float = 50,
+        page_size: str = "A4",
+        font: str = "CalibriB",
+        font_size: int = 12,
+        locale: str = "Russian_Russia"
+) -> bytes:
+    """
+    Rasterizes the month of the year as it is laid out on the page
+    and returns it as PNG.
+    """
+    cal = Calendar.Calendar(
+        year,
+        page_size=Calendar.PAGE_SIZES[page_size],
+        font=font,
+        font_size=font_size,
+        locale=locale
+    )
+    cal.setup(render=False)
+    return render_month(cal, month, dpi)
+
+
+def iter_previews(
+        years: typing.Iterable[int],
+        dpi: float = 100,
+        thumbnail_dpi: float = 50,
+        jobs: int = 1,
+        **kwargs
+) -> typing.Iterator[typing.Tuple[str, bytes]]:
+    """
+    Rasterizes pages of the years and thumbnails of their months
+    in a pool of jobs worker processes. Yields file names and PNG data
+    as soon as every image is ready. Keyword arguments are passed
+    to render_preview and render_thumbnail.
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {}
+        for year in years:
+            futures[pool.submit(
+                render_preview, year, dpi, **kwargs
+            )] = f"Calendar_{year}.png"
+            for month in range(1, 13):
+                futures[pool.submit(
+                    render_thumbnail, year, month, thumbnail_dpi, **kwargs
+                )] = f"Calendar_{year}_{month:02d}.png"
+        for future in concurrent.futures.as_completed(futures):
+            yield futures[future], future.result()
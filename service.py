@@ -0,0 +1,164 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import json
+import multiprocessing
+import typing
+import urllib.parse
+from collections import OrderedDict
+
+import Calendar
+
+
+class CalendarService:
+    """
+    Asyncio HTTP service answering
+    /calendar/{year}.pdf?size=A4&font=CalibriB&font_size=12,
+    /calendar/{year}.json and /stats.
+    Documents are produced in a pool of worker processes and kept
+    in a bounded LRU cache. Concurrent requests for the same document
+    share a single rendering. Workers are spawned rather than forked,
+    as they are started on demand while connections are open and
+    a forked worker would keep their sockets open.
+    """
+    def __init__(self, jobs: typing.Optional[int] = None,
+                 cache_size: int = 128):
+        self.pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.cache: typing.OrderedDict[tuple, bytes] = OrderedDict()
+        self.cache_size = cache_size
+        self.pending: typing.Dict[tuple, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: tuple, function: typing.Callable,
+                  *args) -> bytes:
+        """
+        Returns a cached document or produces it with the function
+        in the worker pool. The key should cover all the arguments.
+        """
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        if key in self.pending:
+            self.hits += 1
+            return await asyncio.shield(self.pending[key])
+
+        self.misses += 1
+        future = asyncio.get_running_loop().run_in_executor(
+            self.pool, function, *args
+        )
+        self.pending[key] = future
+        try:
+            data = await asyncio.shield(future)
+        finally:
+            del self.pending[key]
+        self.cache[key] = data
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return data
+
+    def stats(self) -> bytes:
+        return json.dumps({
+            "hits": self.hits,
+            "misses": self.misses,
+            "cached": len(self.cache),
+            "cache_size": self.cache_size,
+            "pending": len(self.pending),
+        }).encode()
+
+    async def dispatch(
+            self,
+            path: str,
+            query: typing.Dict[str, str]
+    ) -> typing.Tuple[int, str, bytes]:
+        """
+        Routes a request. Returns status, content type and body.
+        """
+        if path == "/stats":
+            return 200, "application/json", self.stats()
+
+        directory, _, name = path.rpartition("/")
+        year, _, extension = name.partition(".")
+        if directory != "/calendar" or not year.isdigit():
+            return 404, "text/plain", b"Not found"
+        year = int(year)
+        if not 1 <= year <= 9998:
+            return 400, "text/plain", b"Year is out of range"
+
+        if extension == "json":
+            data = await self.get(
+                ("json", year), Calendar.classification_json, year
+            )
+            return 200, "application/json", data
+        if extension != "pdf":
+            return 404, "text/plain", b"Not found"
+
+        page_size = query.get("size", "A4").upper()
+        font = query.get("font", "CalibriB")
+        font_size = query.get("font_size", "12")
+        if (page_size not in Calendar.PAGE_SIZES
+                or font not in Calendar.FONT_FILES
+                or not font_size.isdigit()
+                or not 6 <= int(font_size) <= 48):
+            return 400, "text/plain", b"Unsupported size, font or font_size"
+        data = await self.get(
+            ("pdf", year, page_size, font, int(font_size)),
+            Calendar.render_calendar,
+            year, page_size, font, int(font_size)
+        )
+        return 200, "application/pdf", data
+
+    async def handle(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Serves a single HTTP/1.1 request and closes the connection.
+        """
+        try:
+            request_line = (await reader.readline()).decode("latin1")
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            method, target, _ = (request_line.split() + ["", "", ""])[:3]
+            url = urllib.parse.urlsplit(target)
+            query = dict(urllib.parse.parse_qsl(url.query))
+            if method not in ("GET", "HEAD"):
+                status, content_type, body = (
+                    405, "text/plain", b"Method not allowed"
+                )
+            else:
+                try:
+                    status, content_type, body = await self.dispatch(
+                        url.path, query
+                    )
+                except Exception as exception:
+                    status, content_type, body = (
+                        500, "text/plain", repr(exception).encode()
+                    )
+            reason = {200: "OK", 400: "Bad Request", 404: "Not Found",
+                      405: "Method Not Allowed",
+                      500: "Internal Server Error"}[status]
+            writer.write(
+                f"HTTP/1.1 {status} {reason}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode()
+            )
+            if method != "HEAD":
+                writer.write(body)
+            await writer.drain()
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving calendars on http://{host}:{port}/")
+        async with server:
+            await server.serve_forever()
+
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Calendar.py is a script beside the tests directory, not a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,87 @@
+import datetime
+
+from Calendar import Calendar, Holiday
+
+
+def compute(cal: Calendar) -> Calendar:
+    """
+    Reference implementation of the working time rules the rule engine
+    is checked against: sets a calendar up day by day from the raw rules
+    it was created with.
+    If it is a transferable holiday and concurs with a weekend,
+    it marks next day as weekend.
+    :param cal: a calendar created but not set up yet
+    :return: the same calendar
+    """
+    # convert holidays to datetime objects of the year
+    for date in cal.holidays:
+        date[0] = datetime.date(cal.year, *date[0])
+
+    # convert weekend transfer to datetime
+    for date in cal.weekend_transfer:
+        date[0], date[1] = (
+            datetime.date.fromordinal(date[0]),
+            datetime.date.fromordinal(date[1])
+        )
+
+    # convert holidays data to Holiday object
+    for i, date in enumerate(cal.holidays):
+        cal.holidays[i] = Holiday(
+            date=[date[0]],
+            is_transferable=bool(date[1]),
+            name=date[2]
+        )
+
+    for i, base_holiday in enumerate(cal.holidays):
+        for j, probe_holiday in reversed(list(enumerate(cal.holidays))):
+            if j > i and base_holiday.name == probe_holiday.name:
+                cal.holidays[i].date.append(*probe_holiday.date)
+                del cal.holidays[j]
+
+    # iterate over all days in a year
+    start_date = datetime.date(cal.year, 1, 1)
+    end_date = datetime.date(cal.year + 1, 1, 1)
+    dates = [
+        start_date + datetime.timedelta(days=x)
+        for x in range((end_date - start_date).days)
+    ]
+
+    for date in dates:
+        # populate weekends
+        if date.weekday() in (5, 6):
+            cal.weekends.add(date)
+
+    # exchange holidays according to weekend transfer list
+    for date in cal.weekend_transfer:
+        cal.weekends.discard(date[0])
+        cal.weekends.add(date[1])
+
+    holiday_dates = {
+        date for holiday in cal.holidays for date in holiday.date
+    }
+    transferable_dates = {
+        date for holiday in cal.holidays for date in holiday.date
+        if holiday.is_transferable
+    }
+
+    for date in dates:
+        # Populate weekend transfers and shortened work days
+        # warning!: shortened days are calculated
+        # only for transferable holidays.
+        if date in transferable_dates:
+            if date in cal.weekends:
+                # a transferable date has collapsed with weekend,
+                # move it to the next day which is not Saturday or Sunday
+                transfer_day = date + datetime.timedelta(days=1)
+                while transfer_day.weekday() in (5, 6):
+                    transfer_day += datetime.timedelta(days=1)
+                cal.weekends.add(transfer_day)
+                cal.weekends.discard(date)
+            prev_date = date - datetime.timedelta(days=1)
+            if prev_date not in cal.weekends:
+                cal.shortened_work_day.add(prev_date)
+        elif date in holiday_dates:
+            cal.weekends.discard(date)
+
+    cal.build_day_index()
+    return cal
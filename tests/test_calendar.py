@@ -0,0 +1,399 @@
+import datetime
+import json
+import random
+import typing
+
+import pytest
+
+import Calendar
+import reference
+
+
+def set_up(year: int, country: str = "RU") -> Calendar.Calendar:
+    cal = Calendar.Calendar(year, country=country)
+    cal.setup(render=False)
+    return cal
+
+
+def assert_same_year(cal: Calendar.Calendar, expected: Calendar.Calendar):
+    def in_year(dates):
+        return {date for date in dates if date.year == expected.year}
+
+    assert cal.day_index == expected.day_index
+    assert cal.holiday_names == expected.holiday_names
+    assert cal.working_days == expected.working_days
+    assert in_year(cal.weekends) == in_year(expected.weekends)
+    assert (in_year(cal.shortened_work_day)
+            == in_year(expected.shortened_work_day))
+
+
+@pytest.mark.parametrize("country", ["RU", "RU-TA"])
+def test_setup_matches_reference(country):
+    Calendar.rule_engine.clear()
+    for year in range(1990, 2101):
+        assert_same_year(
+            set_up(year, country),
+            reference.compute(Calendar.Calendar(year, country=country))
+        )
+
+
+@pytest.mark.parametrize("country", ["RU", "RU-TA"])
+def test_classify_years_matches_reference(country):
+    compact_years = Calendar.CompactYear.for_years(1990, 2100, country)
+    for compact in compact_years:
+        expected = reference.compute(
+            Calendar.Calendar(compact.year, country=country)
+        )
+        assert compact == Calendar.CompactYear.from_calendar(expected)
+
+
+def test_classify_years_follows_chained_transfers(tmp_path, monkeypatch):
+    # a weekend moved onto Friday 7 March 2025 moves that holiday to
+    # Monday 10 March together with Saturday 8 March, and the holiday
+    # on Monday moves further to Tuesday 11 March
+    rules = tmp_path / "holidays.json"
+    rules.write_text(json.dumps({
+        "version": 1,
+        "countries": {
+            "TEST": {
+                "holidays": [
+                    ["3-7", 1, "A"], ["3-8", 1, "B"], ["3-10", 1, "C"],
+                ],
+                "transfers": {"2025": [["2025-03-01", "2025-03-07"]]},
+            },
+        },
+    }))
+    monkeypatch.setattr(
+        Calendar, "load_rules", lambda: Calendar.HolidayRules(str(rules))
+    )
+
+    compact_years = Calendar.CompactYear.for_years(2024, 2026, "TEST")
+    for compact in compact_years:
+        expected = reference.compute(
+            Calendar.Calendar(compact.year, country="TEST")
+        )
+        assert compact == Calendar.CompactYear.from_calendar(expected)
+    year = compact_years[1]
+    assert year.day_type(datetime.date(2025, 3, 1)) == Calendar.WORKING_DAY
+    assert year.day_type(datetime.date(2025, 3, 6)) == Calendar.SHORTENED_DAY
+    assert year.day_type(datetime.date(2025, 3, 11)) == Calendar.WEEKEND
+    assert year.day_type(datetime.date(2025, 3, 12)) == Calendar.WORKING_DAY
+
+
+def recomputed(cal: Calendar.Calendar) -> Calendar.Calendar:
+    """
+    Sets up the year of a changed calendar from scratch by the reference
+    with the holidays and weekend transfers the calendar has now.
+    """
+    fresh = Calendar.Calendar(cal.year, country=cal.country)
+    fresh.holidays = [
+        [(date.month, date.day), int(holiday.is_transferable), holiday.name]
+        for holiday in cal.holidays for date in holiday.date
+    ]
+    fresh.weekend_transfer = [
+        [weekend.toordinal(), day_off.toordinal()]
+        for weekend, day_off in cal.weekend_transfer
+    ]
+    return reference.compute(fresh)
+
+
+def test_transfer_onto_a_weekday_after_transfer_from_it():
+    cal = set_up(2024)
+    # 29 April 2024 is a Monday made a day off by the rules,
+    # a later transfer away from it makes it a working day again
+    assert cal.add_weekend_transfer(
+        datetime.date(2024, 4, 29), datetime.date(2024, 5, 15)
+    ) == [4, 5]
+    assert cal.day_type(datetime.date(2024, 4, 29)) == Calendar.WORKING_DAY
+    assert_same_year(cal, recomputed(cal))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_changes_match_full_recompute(seed):
+    rng = random.Random(seed)
+    year = rng.randrange(1995, 2031)
+    cal = set_up(year)
+    first = datetime.date(year, 1, 1)
+
+    def random_day() -> datetime.date:
+        return first + datetime.timedelta(days=rng.randrange(365))
+
+    for _ in range(30):
+        before = {month: cal.month_totals(month) for month in range(1, 13)}
+        holiday_dates = [
+            date for holiday in cal.holidays for date in holiday.date
+        ]
+        action = rng.randrange(4)
+        if action == 0:
+            date = random_day()
+            if date in holiday_dates:
+                continue
+            names = [holiday.name for holiday in cal.holidays] + ["X", "Y"]
+            months = cal.add_holiday(
+                date, rng.choice(names), rng.random() < 0.7
+            )
+        elif action == 1 and holiday_dates:
+            months = cal.remove_holiday(rng.choice(holiday_dates))
+        elif action == 2 or not cal.weekend_transfer:
+            # transfers from and onto existing transfers
+            # and holidays as often as not
+            known = holiday_dates + [
+                date for transfer in cal.weekend_transfer
+                for date in transfer
+            ]
+            weekend, day_off = (
+                rng.choice(known) if known and rng.random() < 0.5
+                else random_day()
+                for _ in range(2)
+            )
+            months = cal.add_weekend_transfer(weekend, day_off)
+        else:
+            months = cal.remove_weekend_transfer(
+                *rng.choice(cal.weekend_transfer)
+            )
+
+        assert_same_year(cal, recomputed(cal))
+        assert months == [
+            month for month in range(1, 13)
+            if cal.month_totals(month) != before[month]
+        ]
+
+
+def test_setup_again_starts_from_the_rules():
+    cal = set_up(2024)
+    cal.add_holiday(datetime.date(2024, 6, 3), "X")
+    cal.add_weekend_transfer(
+        datetime.date(2024, 4, 29), datetime.date(2024, 5, 15)
+    )
+    cal.setup(render=False)
+    assert_same_year(cal, set_up(2024))
+    assert cal.weekend_transfer == set_up(2024).weekend_transfer
+
+    cal = Calendar.Calendar.from_compact(set_up(2024).compact())
+    cal.add_holiday(datetime.date(2024, 6, 3), "X")
+    cal.setup(render=False)
+    assert_same_year(cal, set_up(2024))
+    # changes after another set up start from the transfers it used
+    cal.add_weekend_transfer(
+        datetime.date(2024, 4, 29), datetime.date(2024, 5, 15)
+    )
+    assert_same_year(cal, recomputed(cal))
+
+
+def test_working_days_of_a_year():
+    working_days = Calendar.WorkingDays.for_years(2024, 2025)
+    # Saturday 28 December 2024 is a working day, the New Year holidays
+    # and the transferred day off last until 8 January 2025
+    assert working_days.is_working_day(datetime.date(2024, 12, 28))
+    assert (working_days.add_workdays(datetime.date(2024, 12, 27), 1)
+            == datetime.date(2024, 12, 28))
+    assert (working_days.next_working_day(datetime.date(2024, 12, 28))
+            == datetime.date(2025, 1, 9))
+    assert (working_days.prev_working_day(datetime.date(2025, 1, 9))
+            == datetime.date(2024, 12, 28))
+    assert working_days.workdays_between(
+        datetime.date(2025, 1, 1), datetime.date(2025, 2, 1)
+    ) == 17
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_working_days_match_brute_force(seed):
+    rng = random.Random(seed)
+    first = datetime.date(2024, 1, 1)
+    # runs of days off of any length, at the edges of the range too
+    day_types = []
+    while len(day_types) < 60:
+        day_type = rng.choice([
+            Calendar.WORKING_DAY, Calendar.SHORTENED_DAY,
+            Calendar.WEEKEND, Calendar.HOLIDAY,
+        ])
+        day_types.extend([day_type] * rng.randint(1, 5))
+    working_days = Calendar.WorkingDays(first, day_types)
+    days = [first + datetime.timedelta(days=i) for i in range(len(day_types))]
+    working = [day for day, day_type in zip(days, day_types)
+               if day_type <= Calendar.SHORTENED_DAY]
+
+    def expect(function, *args):
+        try:
+            return function(*args)
+        except ValueError:
+            return ValueError
+
+    for day in days:
+        assert working_days.is_working_day(day) == (day in working)
+        later = [other for other in working if other > day]
+        earlier = [other for other in working if other < day]
+        assert expect(working_days.next_working_day, day) == (
+            later[0] if later else ValueError
+        )
+        assert expect(working_days.prev_working_day, day) == (
+            earlier[-1] if earlier else ValueError
+        )
+        for count in range(-8, 9):
+            if count > 0:
+                expected = (later[count - 1] if count <= len(later)
+                            else ValueError)
+            elif count < 0:
+                expected = (earlier[count] if -count <= len(earlier)
+                            else ValueError)
+            else:
+                expected = day
+            assert expect(working_days.add_workdays, day, count) == expected
+
+    end = days[-1] + datetime.timedelta(days=1)
+    for start in days + [end]:
+        for stop in days + [end]:
+            expected = len([day for day in working if start <= day < stop])
+            if stop < start:
+                expected = -len(
+                    [day for day in working if stop <= day < start]
+                )
+            assert working_days.workdays_between(start, stop) == expected
+
+    outside = first - datetime.timedelta(days=1)
+    for function, *args in (
+            (working_days.is_working_day, outside),
+            (working_days.is_working_day, end),
+            (working_days.workdays_between, outside, end),
+            (working_days.workdays_between, first,
+             end + datetime.timedelta(days=1)),
+            (working_days.add_workdays, end, 1),
+    ):
+        with pytest.raises(ValueError):
+            function(*args)
+
+
+def day_types_of(first_year: int, last_year: int) -> typing.Dict[
+        datetime.date, int]:
+    span = Calendar.classify_years(first_year, last_year)
+    return dict(zip(span.dates.tolist(), span.day_type.tolist()))
+
+
+def brute_totals(day_types, start, end):
+    days = [day for day in day_types if start <= day < end]
+    return (
+        len(days),
+        sum(day_types[day] <= Calendar.SHORTENED_DAY for day in days),
+        sum(day_types[day] >= Calendar.WEEKEND for day in days),
+        sum(day_types[day] == Calendar.SHORTENED_DAY for day in days),
+    )
+
+
+def as_tuple(totals: Calendar.Totals) -> tuple:
+    return totals.days, totals.work_days, totals.holidays, totals.short_days
+
+
+def test_working_time_periods_match_brute_force():
+    day_types = day_types_of(2024, 2025)
+    working_time = Calendar.WorkingTime.for_years(2024, 2025)
+    rng = random.Random(0)
+    days = sorted(day_types)
+    for _ in range(200):
+        start, end = sorted(rng.sample(days, 2))
+        assert (as_tuple(working_time.totals(start, end))
+                == brute_totals(day_types, start, end))
+
+    # a fiscal year from July crosses the calendar year
+    assert as_tuple(working_time.fiscal_year(2024, 7)) == brute_totals(
+        day_types, datetime.date(2024, 7, 1), datetime.date(2025, 7, 1)
+    )
+    assert (as_tuple(working_time.fiscal_year(2024))
+            == as_tuple(working_time.year(2024)))
+    with pytest.raises(ValueError):
+        working_time.fiscal_year(2025, 7)
+    # the first ISO week of 2025 starts on 30 December 2024
+    assert as_tuple(working_time.iso_week(2025, 1)) == brute_totals(
+        day_types, datetime.date(2024, 12, 30), datetime.date(2025, 1, 6)
+    )
+    assert as_tuple(working_time.quarter(2025, 4)) == brute_totals(
+        day_types, datetime.date(2025, 10, 1), datetime.date(2026, 1, 1)
+    )
+
+    totals = working_time.month(2024, 2)
+    # Thursday 22 February 2024 is shortened before Defender's Day
+    assert as_tuple(totals) == (29, 20, 9, 1)
+    assert totals.hours == [159, 20 * 7.2 - 1, 20 * 4.8 - 1]
+
+
+def test_norms_match_brute_force():
+    day_types = day_types_of(2024, 2024)
+    working_time = Calendar.WorkingTime.for_years(2024, 2024)
+    date = datetime.date
+    employees = [
+        # weekly hours, first and last day of employment
+        (40, date(2023, 6, 1), date(2026, 1, 31)),
+        (36, date(2024, 2, 15), date(2024, 11, 3)),
+        (24, date(2024, 3, 10), date(2024, 3, 9)),
+        (4, date(2024, 1, 1), date(2024, 12, 31)),
+        (2.5, date(2024, 2, 20), date(2025, 3, 1)),
+    ]
+    norms = working_time.norms(
+        2024,
+        [hours for hours, _, _ in employees],
+        [start for _, start, _ in employees],
+        [end for _, _, end in employees]
+    )
+
+    for i, (hours, start, end) in enumerate(employees):
+        for month in range(1, 13):
+            expected = 0.0
+            for day, day_type in day_types.items():
+                if day.month != month or not start <= day <= end:
+                    continue
+                if day_type == Calendar.WORKING_DAY:
+                    expected += hours / 5
+                elif day_type == Calendar.SHORTENED_DAY:
+                    # never less than no work at all
+                    expected += hours / 5 - min(hours / 5, 1)
+            assert norms.months[i][month - 1] == pytest.approx(expected)
+    assert norms.year.tolist() == pytest.approx(
+        norms.months.sum(axis=1).tolist()
+    )
+    # hired after they leave
+    assert norms.year[2] == 0
+    assert norms.quarters[1].tolist() == pytest.approx(
+        norms.months[1].reshape(4, 3).sum(axis=1).tolist()
+    )
+
+
+def test_whole_year_norms_match_the_schedule():
+    cal = set_up(2024)
+    working_time = Calendar.WorkingTime.from_calendar(cal)
+    norms = working_time.norms(2024, Calendar.WEEK_NORMS)
+    # render_schedule prints hours of every month totals
+    for month in range(1, 13):
+        assert norms.months[:, month - 1].tolist() == pytest.approx(
+            working_time.month(2024, month).hours
+        )
+    assert norms.year.tolist() == pytest.approx(
+        working_time.year(2024).hours
+    )
+
+
+@pytest.mark.parametrize("country", ["RU", "RU-TA"])
+def test_compact_years_survive_a_round_trip(country):
+    for compact in Calendar.CompactYear.for_years(1990, 2100, country):
+        data = compact.to_bytes()
+        copy = Calendar.CompactYear.from_bytes(data)
+        assert copy == compact
+        assert copy.to_bytes() == data
+        # read from a memory map or any other buffer as well
+        assert Calendar.CompactYear.from_bytes(memoryview(data)) == compact
+        cal = Calendar.Calendar.from_compact(copy)
+        assert cal.compact() == compact
+        assert_same_year(cal, set_up(compact.year, country))
+
+
+def test_compact_year_lookups():
+    compact = set_up(2024).compact()
+    assert compact.day_type(datetime.date(2024, 2, 22)) == (
+        Calendar.SHORTENED_DAY
+    )
+    assert compact.holiday_name(datetime.date(2024, 2, 23)) == (
+        "День защитника Отечества"
+    )
+    assert compact.holiday_name(datetime.date(2024, 2, 22)) is None
+    with pytest.raises(ValueError):
+        compact.day_type(datetime.date(2025, 1, 1))
+    with pytest.raises(ValueError):
+        Calendar.CompactYear.from_bytes(b"XXXX" + compact.to_bytes()[4:])
@@ -0,0 +1,71 @@
+import io
+import json
+
+import pytest
+
+import Calendar
+
+
+def test_ics_text_escapes_text_values():
+    assert (Calendar.ics_text("a\\b, c; d\ne")
+            == "a\\\\b\\, c\\; d\\ne")
+
+
+def test_ics_summaries_are_escaped(tmp_path, monkeypatch):
+    rules = tmp_path / "holidays.json"
+    rules.write_text(json.dumps({
+        "version": 1,
+        "countries": {
+            "TEST": {"holidays": [["5-1", 1, "Spring; labour, day"]]},
+        },
+    }))
+    monkeypatch.setattr(
+        Calendar, "load_rules", lambda: Calendar.HolidayRules(str(rules))
+    )
+
+    stream = io.StringIO()
+    Calendar.export_days(stream, "ics", [2024], "TEST")
+    lines = stream.getvalue().replace("\r\n ", "").split("\r\n")
+    summaries = [line for line in lines if line.startswith("SUMMARY:")]
+    assert summaries == [
+        "SUMMARY:Предпраздничный день\\, короче на один час",
+        "SUMMARY:Spring\\; labour\\, day",
+    ]
+
+
+def classify(text, column, delimiter=";"):
+    output = io.StringIO()
+    Calendar.classify_dates(io.StringIO(text), output, column, delimiter)
+    return output.getvalue().splitlines()
+
+
+def test_classify_dates_pads_short_rows_to_the_header():
+    assert classify("id;date;note\n3\n4;2024-01-01\n", "date") == [
+        "id;date;note;type;holiday;hours_40;hours_36;hours_24",
+        "3;;;;;;;",
+        "4;2024-01-01;;holiday;Новогодние каникулы;0.0;0.0;0.0",
+    ]
+
+
+def test_classify_dates_rejects_rows_longer_than_the_header():
+    with pytest.raises(ValueError):
+        classify("id;date\n1;2024-01-01;extra\n", "date")
+
+
+def test_classify_dates_inserts_fields_after_a_numbered_column():
+    assert classify("2024-01-01;a;b\n2024-01-09\n3\nx;2024-03-07\n",
+                    "1") == [
+        "2024-01-01;holiday;Новогодние каникулы;0.0;0.0;0.0;a;b",
+        "2024-01-09;working;;8.0;7.2;4.8",
+        "3;;;;;",
+        "x;;;;;;2024-03-07",
+    ]
+    assert classify("3\nx;2024-03-07;y\n", "2") == [
+        "3;;;;;;",
+        "x;2024-03-07;shortened;;7.0;6.2;3.8;y",
+    ]
+
+
+def test_classify_dates_rejects_column_zero():
+    with pytest.raises(ValueError):
+        classify("2024-01-01\n", "0")
@@ -0,0 +1,36 @@
+import gc
+import io
+
+from reportlab.lib.colors import black
+from reportlab.pdfgen import canvas
+
+import Calendar
+
+
+def test_every_canvas_is_instrumented_once():
+    instrumentation = Calendar.Instrumentation()
+    for _ in range(10):
+        # a canvas of a previous round is collected, its id may be reused
+        gc.collect()
+        pdf = canvas.Canvas(io.BytesIO())
+        instrumentation.instrument(pdf)
+        instrumentation.instrument(pdf)
+        with instrumentation.measure("stage"):
+            pdf.setFillColor(black)
+            pdf.drawString(0, 0, "text")
+            pdf.drawCentredString(0, 0, "text")
+            pdf.drawRightString(0, 0, "text")
+            text = pdf.beginText()
+            text.textOut("text")
+            pdf.drawText(text)
+
+    calls = instrumentation.as_dict()["calls"]["stage"]
+    # strings drawn by the canvas through drawText count once
+    assert calls == {
+        "drawCentredString": 10,
+        "drawRightString": 10,
+        "drawString": 10,
+        "drawText": 10,
+        "setFillColor": 10,
+        "line": 0,
+    }
@@ -0,0 +1,93 @@
+import json
+import os
+
+import Calendar
+
+
+def test_key_changes_with_every_input(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = Calendar.OutputCache(str(tmp_path / "cache"))
+
+    def key(year=2024, **kwargs):
+        return cache.key(Calendar.Calendar(year, **kwargs))
+
+    keys = {
+        key(),
+        key(2025),
+        key(page_size=Calendar.A5),
+        key(font="Calibri"),
+        key(font_size=10),
+        key(locale="C"),
+        key(country="RU-TA"),
+    }
+    assert len(keys) == 7
+    assert key() == key()
+
+    base = key()
+    # a font file appearing or changing
+    (tmp_path / "CalibriB.ttf").write_bytes(b"font")
+    with_font = key()
+    assert with_font != base
+    (tmp_path / "CalibriB.ttf").write_bytes(b"other font")
+    assert key() != with_font
+
+    monkeypatch.setattr(Calendar, "code_version", lambda: "changed")
+    assert key() not in (base, with_font)
+
+
+def test_key_changes_with_the_rules(tmp_path, monkeypatch):
+    cache = Calendar.OutputCache(str(tmp_path / "cache"))
+    rules = tmp_path / "holidays.json"
+    source = {
+        "version": 1,
+        "countries": {"TEST": {"holidays": [["5-1", 1, "A"]]}},
+    }
+
+    def key():
+        rules.write_text(json.dumps(source))
+        monkeypatch.setattr(
+            Calendar, "load_rules",
+            lambda: Calendar.HolidayRules(str(rules))
+        )
+        return cache.key(Calendar.Calendar(2024, country="TEST"))
+
+    keys = [key()]
+    source["countries"]["TEST"]["transfers"] = {
+        "2024": [["2024-05-04", "2024-05-02"]]
+    }
+    keys.append(key())
+    source["countries"]["TEST"]["holidays"].append(["5-9", 1, "B"])
+    keys.append(key())
+    # transfers of other years do not matter
+    source["countries"]["TEST"]["transfers"]["2025"] = [
+        ["2025-05-03", "2025-05-02"]
+    ]
+    keys.append(key())
+    assert len(set(keys)) == 3
+    assert keys[2] == keys[3]
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = Calendar.OutputCache(str(tmp_path / "cache"), size_limit=250)
+    output = tmp_path / "Calendar.pdf"
+    copy = tmp_path / "copy.pdf"
+    assert not cache.get("a", str(copy))
+
+    for age, key in ((30, "a"), (20, "b")):
+        output.write_bytes(key.encode() * 100)
+        cache.put(key, str(output))
+        # files are told apart by modification time
+        stat = os.stat(cache.path(key))
+        os.utime(cache.path(key), ns=(stat.st_atime_ns,
+                                      stat.st_mtime_ns - age * 10 ** 9))
+
+    # using "a" makes "b" the least recently used one
+    assert cache.get("a", str(copy))
+    assert copy.read_bytes() == b"a" * 100
+    output.write_bytes(b"c" * 100)
+    cache.put("c", str(output))
+
+    assert sorted(os.listdir(cache.directory)) == ["a.pdf", "c.pdf"]
+    assert not cache.get("b", str(copy))
+    assert cache.get("c", str(copy))
+    assert copy.read_bytes() == b"c" * 100
@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+import service
+
+
+async def request(port: int, target: str) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    # the connection is closed once the response has been sent
+    data = await asyncio.wait_for(reader.read(), 10)
+    writer.close()
+    await writer.wait_closed()
+    return data
+
+
+def test_response_ends_with_the_connection():
+    async def run() -> None:
+        calendar_service = service.CalendarService(jobs=1)
+        server = await asyncio.start_server(
+            calendar_service.handle, "127.0.0.1", 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        try:
+            async with server:
+                for _ in range(2):
+                    head, _, body = (
+                        await request(port, "/calendar/2024.json")
+                    ).partition(b"\r\n\r\n")
+                    assert head.startswith(b"HTTP/1.1 200 OK")
+                    assert json.loads(body)["year"] == 2024
+                stats = json.loads(
+                    (await request(port, "/stats")).partition(b"\r\n\r\n")[2]
+                )
+                assert (stats["hits"], stats["misses"]) == (1, 1)
+        finally:
+            calendar_service.pool.shutdown()
+
+    asyncio.run(run())
@@ -0,0 +1,44 @@
+import os
+
+import watcher
+
+
+def make_watcher(tmp_path, generated):
+    calendar_watcher = watcher.CalendarWatcher(str(tmp_path))
+    calendar_watcher.generate = generated.append
+    return calendar_watcher
+
+
+def test_job_is_run_once_it_stops_changing(tmp_path):
+    generated = []
+    calendar_watcher = make_watcher(tmp_path, generated)
+    job = tmp_path / "job"
+    job.write_text("2023")
+    calendar_watcher.run_jobs()
+    assert generated == []
+
+    # still being written
+    with job.open("a") as file:
+        file.write(",2025-2026")
+    calendar_watcher.run_jobs()
+    assert generated == []
+
+    calendar_watcher.run_jobs()
+    assert generated == [2023, 2025, 2026]
+    assert os.listdir(tmp_path) == []
+
+
+def test_vanished_and_unreadable_jobs_are_skipped(tmp_path, monkeypatch):
+    generated = []
+    calendar_watcher = make_watcher(tmp_path, generated)
+    (tmp_path / "binary").write_bytes(b"\xff\xfe")
+    (tmp_path / "job").write_text("2024")
+    calendar_watcher.run_jobs()
+
+    listdir = os.listdir
+    monkeypatch.setattr(
+        watcher.os, "listdir", lambda path: ["gone"] + listdir(path)
+    )
+    calendar_watcher.run_jobs()
+    assert generated == [2024]
+    assert listdir(tmp_path) == []
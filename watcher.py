@@ -0,0 +1,139 @@
+import contextlib
+import os
+import stat
+import time
+import typing
+
+import Calendar
+
+
+class CalendarWatcher:
+    """
+    Long running generation of calendars. Fonts and holiday rules are
+    loaded once and generated years are kept in memory. The rules file
+    and the job directory are polled every interval seconds. A file put
+    into the job directory names years as the command line does, once it
+    has stopped changing the years are generated and the file is removed.
+    When the rules change, only years whose classification has changed
+    are generated again.
+    """
+    def __init__(
+            self,
+            job_directory: str,
+            interval: float = 1.0,
+            cache: typing.Optional[Calendar.OutputCache] = None
+    ):
+        self.job_directory = job_directory
+        self.interval = interval
+        self.cache = cache
+        # year -> classification it has been generated with
+        self.generated: typing.Dict[int, Calendar.CompactYear] = {}
+        self.rules_stat: typing.Optional[typing.Tuple[int, int]] = None
+        # job file -> size and modification time seen by the last poll
+        self.job_stats: typing.Dict[str, typing.Tuple[int, int]] = {}
+
+    def warm_up(self) -> None:
+        """
+        Imports reportlab and loads fonts and rules ahead of the first job.
+        """
+        Calendar.import_reportlab()
+        for font in Calendar.FONT_FILES:
+            with contextlib.suppress(FileNotFoundError):
+                Calendar.register_font(font)
+        Calendar.load_rules()
+        self.rules_changed()
+
+    def rules_changed(self) -> bool:
+        source = os.stat(Calendar.RULES_FILE)
+        rules_stat = (source.st_mtime_ns, source.st_size)
+        changed = self.rules_stat is not None and rules_stat != self.rules_stat
+        self.rules_stat = rules_stat
+        return changed
+
+    def generate(self, year: int) -> None:
+        try:
+            output, cached = Calendar.generate_year(year, self.cache)
+        except Exception as exception:
+            print(f"{year}: failed: {exception!r}")
+            return
+        self.generated[year] = Calendar.rule_engine.resolve("RU", year)
+        if cached:
+            print(f"{year}: {output} is up to date")
+        else:
+            print(f"{year}: {output} created")
+
+    def reload_rules(self) -> None:
+        """
+        Loads changed rules and generates the years they affect.
+        """
+        Calendar.load_rules.cache_clear()
+        Calendar.rule_engine.clear()
+        try:
+            Calendar.load_rules()
+        except (OSError, ValueError, KeyError) as exception:
+            # the file may be saved halfway, it is loaded on next change
+            print(f"{Calendar.RULES_FILE} cannot be loaded: {exception!r}")
+            Calendar.load_rules.cache_clear()
+            return
+        for year, compact in sorted(self.generated.items()):
+            if Calendar.rule_engine.resolve("RU", year) != compact:
+                self.generate(year)
+
+    def run_jobs(self) -> None:
+        """
+        Runs job files whose size and modification time have not changed
+        since the previous poll, so a file still being written is left
+        for later. A job is claimed by renaming it to a hidden name first,
+        a file which disappears meanwhile is skipped.
+        """
+        job_stats: typing.Dict[str, typing.Tuple[int, int]] = {}
+        for name in sorted(os.listdir(self.job_directory)):
+            if name.startswith("."):
+                continue
+            path = os.path.join(self.job_directory, name)
+            claimed = os.path.join(
+                self.job_directory, f".{name}.{os.getpid()}"
+            )
+            try:
+                source = os.stat(path)
+                if not stat.S_ISREG(source.st_mode):
+                    continue
+                job_stats[name] = (source.st_size, source.st_mtime_ns)
+                if self.job_stats.get(name) != job_stats[name]:
+                    continue
+                os.replace(path, claimed)
+                try:
+                    with open(claimed, encoding="utf-8") as file:
+                        text = file.read().strip()
+                finally:
+                    os.remove(claimed)
+            except FileNotFoundError:
+                # removed or claimed by another watcher
+                continue
+            except (OSError, UnicodeDecodeError) as exception:
+                print(f"{name}: cannot be read: {exception!r}")
+                continue
+            del job_stats[name]
+            try:
+                years = Calendar.parse_years(text)
+            except ValueError as exception:
+                print(f"{name}: {exception}")
+                continue
+            for year in years:
+                self.generate(year)
+        self.job_stats = job_stats
+
+    def run(self, years: typing.Iterable[int] = ()) -> None:
+        """
+        Generates the years and watches until interrupted.
+        """
+        self.warm_up()
+        os.makedirs(self.job_directory, exist_ok=True)
+        for year in years:
+            self.generate(year)
+        print(f"Watching {Calendar.RULES_FILE} and {self.job_directory}")
+        while True:
+            if self.rules_changed():
+                self.reload_rules()
+            self.run_jobs()
+            time.sleep(self.interval)